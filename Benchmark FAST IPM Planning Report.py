@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+
+
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+# * Imports
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+
+# Standard library imports
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+# * Load the report script, its file name has spaces so it can't be imported with a plain import statement
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+REPORT_SCRIPT_PATH = Path(__file__).resolve().parent / 'Create FAST IPM Planning Report.py'
+BENCHMARK_BASELINE_PATH = Path(__file__).resolve().parent / 'Benchmark files' / 'baseline.json'
+
+# modules that --help, --validate and an up to date run must not import
+HEAVY_MODULES = ('xlsxwriter', 'numpy', 'pyarrow', 'openpyxl', 'pandas', 'xlrd', 'kclGetJiraSprintDates_2',
+                 'kclGetJiraSprintXlsxData_1')
+
+
+def load_report_module():
+    spec = importlib.util.spec_from_file_location('create_fast_ipm_planning_report', REPORT_SCRIPT_PATH)
+    report_module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = report_module
+    spec.loader.exec_module(report_module)
+
+    return report_module
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# * Class Declarations
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+
+class SyntheticStoryRec:
+    # has the same fields the report reads from a kclGetJiraSprintXlsxData_1.JiraStoryRec
+    def __init__(self, key_in, issue_type_in, summary_in, assignee_in, status_in, priority_in, story_points_in,
+                 sprints_in, created_date_in: datetime | None = None):
+        self.key: str = key_in
+        self.issue_type: str = issue_type_in
+        self.summary: str = summary_in
+        self.assignee: str = assignee_in
+        self.status: str = status_in
+        self.priority: str = priority_in
+        self.story_points: int = story_points_in
+        self.sprints: list[str] = sprints_in
+        self.created_date: datetime | None = created_date_in
+
+
+class SyntheticSprintDateRec:
+    # has the same fields the report reads from a kclGetJiraSprintDates_2 sprint record
+    def __init__(self, name_in: str, start_date_in: datetime, end_date_in: datetime):
+        self.name: str = name_in
+        self.start_date: datetime = start_date_in
+        self.end_date: datetime = end_date_in
+
+
+class SyntheticSprintDateData:
+    # stands in for kclGetJiraSprintDates_2.SprintDateData, sprints 1 to num_sprints are two weeks long and back to back
+    def __init__(self, num_sprints_in: int, sprint_prefix_in: str = 'FASTR1i',
+                 first_start_date_in: datetime = datetime(2022, 1, 3)):
+        self.sprint_recs: dict[int, SyntheticSprintDateRec] = {}
+        for sprint_num in range(1, num_sprints_in + 1):
+            start_date = first_start_date_in + timedelta(days=14 * (sprint_num - 1))
+            self.sprint_recs[sprint_num] = SyntheticSprintDateRec(sprint_prefix_in + str(sprint_num), start_date,
+                                                                  start_date + timedelta(days=13))
+
+    def get_sprint_data(self, sprint_number: int) -> SyntheticSprintDateRec | None:
+        return self.sprint_recs.get(sprint_number)
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# * Functions
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def iter_synthetic_stories(num_stories: int, num_assignees: int, seed: int = 1, num_sprints: int = 60,
+                           summary_len: int | None = None):
+    # every field is built fresh for each story, the same way a spreadsheet parser hands them out
+    # stories sit in up to three back to back sprints ending somewhere in the last 19 sprints before num_sprints,
+    # summaries are padded or cut to summary_len characters when it is given, stories are created up to nine days
+    # before the start of their first sprint, using the sprint dates of SyntheticSprintDateData
+    rnd = random.Random(seed)
+    assignees = ['Assignee ' + str(assignee_num) for assignee_num in range(num_assignees)]
+    summary_filler = ' lorem ipsum dolor sit amet' * ((summary_len or 0) // 27 + 1)
+    for story_num in range(num_stories):
+        last_sprint = rnd.randrange(max(3, num_sprints - 19), num_sprints)
+        sprints = ['FASTR1i' + str(sprint_num) for sprint_num in range(last_sprint - rnd.randrange(3), last_sprint + 1)]
+        created_date = datetime(2022, 1, 3) + timedelta(days=14 * (last_sprint - len(sprints)) - story_num % 10)
+        summary = 'Synthetic story summary ' + str(story_num)
+        if summary_len is not None:
+            summary = (summary + summary_filler)[:summary_len]
+        yield SyntheticStoryRec('FAST-' + str(story_num),
+                                ''.join(rnd.choice(('Story', 'Bug', 'Task'))),
+                                summary,
+                                ''.join(rnd.choice(assignees)),
+                                ''.join(rnd.choice(('To Do', 'In Progress', 'In Review', 'Done'))),
+                                ''.join(rnd.choice(('Highest', 'High', 'Medium', 'Low'))),
+                                rnd.choice((0, 1, 2, 3, 5, 8, 13)),
+                                sprints,
+                                created_date)
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def make_synthetic_stories(num_stories: int, num_assignees: int, seed: int = 1) -> list[SyntheticStoryRec]:
+    return list(iter_synthetic_stories(num_stories, num_assignees, seed))
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def linear_scan_grouping(story_store) -> list:
+    # the original O(stories x assignees) grouping, kept here only as the comparison point for the benchmark
+    report_module = sys.modules['create_fast_ipm_planning_report']
+    assignees_list = []
+    for story_row, assignee in enumerate(story_store.assignee):
+        for cur_assignees_rec in assignees_list:
+            if cur_assignees_rec.assignee == assignee:
+                cur_assignees_rec.story_rows.append(story_row)
+                cur_assignees_rec.total_points += story_store.story_points[story_row]
+                break
+        else:
+            assignees_list.append(report_module.AssigneesRec(assignee, story_row,
+                                                             story_store.story_points[story_row]))
+
+    return assignees_list
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def benchmark_grouping(report_module, sizes: list[int], num_assignees: int, linear_limit: int) -> list[dict]:
+    results = []
+
+    print('\n   Grouping benchmark, ' + str(num_assignees) + ' assignees')
+    print('   {:>10}  {:>12}  {:>12}  {:>14}'.format('Stories', 'Hashed (s)', 'ns / story', 'Linear scan (s)'))
+    for num_stories in sizes:
+        story_store = report_module.build_story_store(iter_synthetic_stories(num_stories, num_assignees))
+
+        start_time = time.perf_counter()
+        stories_by_assignee = report_module.group_stories_by_field(story_store, 'assignee')
+        hashed_secs = time.perf_counter() - start_time
+
+        linear_text = '-'
+        if num_stories <= linear_limit:
+            start_time = time.perf_counter()
+            linear_groups = linear_scan_grouping(story_store)
+            linear_text = '{:.4f}'.format(time.perf_counter() - start_time)
+            # both groupings must agree on the order and the totals of every group
+            assert [(rec.assignee, rec.total_points) for rec in linear_groups] == \
+                   [(rec.assignee, rec.total_points) for rec in stories_by_assignee]
+
+        print('   {:>10}  {:>12.4f}  {:>12.1f}  {:>14}'.format(num_stories, hashed_secs,
+                                                                hashed_secs / num_stories * 1e9, linear_text))
+        results.append({'case': 'grouping stories=' + str(num_stories) + ' assignees=' + str(num_assignees),
+                        'metrics': {'hashed_secs': round(hashed_secs, 6)}})
+
+    return results
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def benchmark_velocity(report_module, sizes: list[int], num_assignees: int) -> list[dict]:
+    # the velocity table should cost a constant amount of time per story, so ns / story should stay flat as the
+    # number of stories grows
+    results = []
+    sprint_names = {sprint_num: 'FASTR1i' + str(sprint_num) for sprint_num in range(1, 100)}
+
+    # warm up once so the NumPy import isn't counted in the first timing
+    warm_up_store = report_module.build_story_store(iter_synthetic_stories(10, num_assignees))
+    report_module.calc_velocity_table(warm_up_store,
+                                      report_module.build_sprint_history_index(warm_up_store, 'FASTR1i'),
+                                      sprint_names, max(sprint_names))
+
+    print('\n   Velocity benchmark, ' + str(num_assignees) + ' assignees, ' + str(len(sprint_names)) + ' sprints')
+    print('   {:>10}  {:>12}  {:>12}  {:>12}'.format('Stories', 'Index (s)', 'Velocity (s)', 'ns / story'))
+    for num_stories in sizes:
+        story_store = report_module.build_story_store(iter_synthetic_stories(num_stories, num_assignees))
+
+        start_time = time.perf_counter()
+        sprint_history = report_module.build_sprint_history_index(story_store, 'FASTR1i')
+        index_secs = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        report_module.calc_velocity_table(story_store, sprint_history, sprint_names, max(sprint_names))
+        velocity_secs = time.perf_counter() - start_time
+
+        print('   {:>10}  {:>12.4f}  {:>12.4f}  {:>12.1f}'.format(num_stories, index_secs, velocity_secs,
+                                                                 velocity_secs / num_stories * 1e9))
+        results.append({'case': 'velocity stories=' + str(num_stories) + ' assignees=' + str(num_assignees),
+                        'metrics': {'index_secs': round(index_secs, 6), 'velocity_secs': round(velocity_secs, 6)}})
+
+    return results
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def benchmark_story_memory(report_module, sizes: list[int], num_assignees: int) -> list[dict]:
+    # memory held per story as a list of story record objects versus the columns of a StoryStore, measured with
+    # tracemalloc from the same freshly generated stories
+    results = []
+
+    print('\n   Story memory benchmark (tracemalloc), ' + str(num_assignees) + ' assignees')
+    print('   {:>10}  {:>14}  {:>14}  {:>10}'.format('Stories', 'Records B/story', 'Store B/story', 'Reduction'))
+    for num_stories in sizes:
+        tracemalloc.start()
+        stories = make_synthetic_stories(num_stories, num_assignees)
+        records_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del stories
+
+        tracemalloc.start()
+        story_store = report_module.build_story_store(iter_synthetic_stories(num_stories, num_assignees))
+        store_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del story_store
+
+        print('   {:>10}  {:>14.1f}  {:>14.1f}  {:>9.1f}x'.format(num_stories, records_bytes / num_stories,
+                                                                  store_bytes / num_stories,
+                                                                  records_bytes / store_bytes))
+        results.append({'case': 'memory stories=' + str(num_stories) + ' assignees=' + str(num_assignees),
+                        'metrics': {'store_bytes_per_story': round(store_bytes / num_stories, 1)}})
+
+    return results
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def run_report_pipeline(report_module, sprint_date_index, story_store, sprint_number: int, report_options) -> str:
+    # the same steps main() runs for one sprint, with the report's progress printing thrown away
+    with contextlib.redirect_stdout(io.StringIO()):
+        sprint_data = report_module.build_sprint_data(sprint_number, sprint_date_index, story_store)
+        output_paths = report_module.create_ipm_planning_report(sprint_data, report_options)
+
+    return output_paths[0]
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def benchmark_pipeline(report_module, sizes: list[int], num_assignees: int, num_sprints: int,
+                       summary_len: int | None, output_mode: str, render_jobs: int,
+                       output_formats: list[str]) -> list[dict]:
+    # runs the whole report, sprint history index through workbook close, into a scratch 'Output files' folder
+    # each size is run twice: once timed with the stage profile on and once under tracemalloc for the peak memory,
+    # so the tracing overhead doesn't show up in the throughput. tracemalloc only sees this process, so the peak
+    # memory is left out when the assignee sheets are rendered in other processes
+    results = []
+    traces_memory = render_jobs == 1 or output_mode == 'streaming'
+    sprint_date_index = report_module.build_sprint_date_index(SyntheticSprintDateData(num_sprints))
+    sprint_number = num_sprints - 1
+    report_options = report_module.ReportOptions()
+    report_options.streaming = output_mode == 'streaming'
+    report_options.render_jobs = render_jobs
+    report_options.output_formats = output_formats
+    case_suffix = ' assignees=' + str(num_assignees) + ' sprints=' + str(num_sprints) + \
+                  ' summary=' + str(summary_len) + ' mode=' + output_mode + ' jobs=' + str(render_jobs)
+    if output_formats != ['xlsx']:
+        case_suffix += ' formats=' + ','.join(output_formats)
+
+    print('\n   Pipeline benchmark, ' + str(num_assignees) + ' assignees, ' + str(num_sprints) + ' sprints, ' +
+          'summary length ' + str(summary_len) + ', ' + output_mode + ' output, ' + str(render_jobs) +
+          ' render processes, ' + ','.join(output_formats))
+    print('   {:>10}  {:>10}  {:>12}  {:>12}  {:>10}  {:>11}'.format('Stories', 'Wall (s)', 'Stories / s',
+                                                                    'Sheets (s)', 'Close (s)', 'Peak MB'))
+    start_dir = Path.cwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            (Path(work_dir) / 'Output files').mkdir()
+            for num_stories in sizes:
+                story_store = report_module.build_story_store(
+                    iter_synthetic_stories(num_stories, num_assignees, num_sprints=num_sprints,
+                                           summary_len=summary_len))
+
+                report_module.run_profile.stages = []
+                report_module.enable_run_profile(trace_memory=False)
+                start_time = time.perf_counter()
+                filename = run_report_pipeline(report_module, sprint_date_index, story_store, sprint_number,
+                                               report_options)
+                wall_secs = time.perf_counter() - start_time
+                report_module.run_profile.enabled = False
+
+                # fold the one stage per assignee sheet, or the parallel render, into a single total
+                stage_secs = {}
+                for stage_rec in report_module.run_profile.stages:
+                    stage_name = stage_rec['stage']
+                    if stage_name.startswith('write sheet ') and stage_name != 'write sheet All Assignees' or \
+                            stage_name.startswith('render assignee sheets'):
+                        stage_name = 'write assignee sheets'
+                    stage_secs[stage_name] = round(stage_secs.get(stage_name, 0.0) + stage_rec['wall_secs'], 6)
+                if os.path.isdir(filename):
+                    output_mb = sum(output_file.stat().st_size
+                                    for output_file in Path(filename).iterdir()) / (1024 * 1024)
+                else:
+                    output_mb = os.path.getsize(filename) / (1024 * 1024)
+
+                pipeline_metrics = {'wall_secs': round(wall_secs, 6)}
+                if traces_memory:
+                    tracemalloc.start()
+                    run_report_pipeline(report_module, sprint_date_index, story_store, sprint_number,
+                                        report_options)
+                    pipeline_metrics['peak_mem_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+                    tracemalloc.stop()
+
+                print('   {:>10}  {:>10.3f}  {:>12.0f}  {:>12.3f}  {:>10.3f}  {:>11}'.format(
+                    num_stories, wall_secs, num_stories / wall_secs, stage_secs.get('write assignee sheets', 0.0),
+                    stage_secs.get('workbook close', 0.0),
+                    '{:.1f}'.format(pipeline_metrics['peak_mem_mb']) if traces_memory else '-'))
+                results.append({'case': 'pipeline stories=' + str(num_stories) + case_suffix,
+                                'metrics': pipeline_metrics,
+                                'stories_per_sec': round(num_stories / wall_secs, 1),
+                                'output_mb': round(output_mb, 2),
+                                'stage_secs': stage_secs})
+        finally:
+            os.chdir(start_dir)
+
+    return results
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def benchmark_render_scaling(report_module, sizes: list[int], num_assignees: int, num_sprints: int,
+                             summary_len: int | None, scaling_jobs: int) -> list[dict]:
+    # the same pipeline run with the assignee sheets written in this process and rendered by scaling_jobs worker
+    # processes, the speedup of the whole run and of the sheet stage alone, and the speedup per process, which is
+    # 1.0 for perfectly linear scaling. The parent's fixed cost is the time the parent process spends on the render
+    # path by itself, writing the placeholder sheets, closing the workbook and assembling the rendered sheets into
+    # it, which no number of render processes takes off it
+    if scaling_jobs < 2:
+        print('\n   Render scaling benchmark skipped, it needs --scaling-jobs of 2 or more')
+        return []
+    serial_results = benchmark_pipeline(report_module, sizes, num_assignees, num_sprints, summary_len, 'in-memory', 1,
+                                        ['xlsx'])
+    parallel_results = benchmark_pipeline(report_module, sizes, num_assignees, num_sprints, summary_len, 'in-memory',
+                                          scaling_jobs, ['xlsx'])
+    results = serial_results + parallel_results
+
+    print('\n   Render scaling, 1 against ' + str(scaling_jobs) + ' render processes on ' + str(os.cpu_count()) +
+          ' CPUs')
+    print('   {:>10}  {:>12}  {:>14}  {:>12}  {:>16}'.format('Stories', 'Speedup', 'Sheets speedup', 'Per process',
+                                                            'Parent fixed (s)'))
+    for num_stories, serial_rec, parallel_rec in zip(sizes, serial_results, parallel_results):
+        speedup = serial_rec['metrics']['wall_secs'] / parallel_rec['metrics']['wall_secs']
+        sheets_speedup = serial_rec['stage_secs'].get('write assignee sheets', 0.0) / \
+            max(parallel_rec['stage_secs'].get('write assignee sheets', 0.0), 1e-9)
+        parent_fixed_secs = sum(parallel_rec['stage_secs'].get(stage_name, 0.0)
+                                for stage_name in ('write placeholder sheets', 'workbook close', 'assemble workbook'))
+        print('   {:>10}  {:>11.2f}x  {:>13.2f}x  {:>12.2f}  {:>16.3f}'.format(num_stories, speedup, sheets_speedup,
+                                                                            speedup / scaling_jobs,
+                                                                            parent_fixed_secs))
+        # the parallel to serial wall time ratio is the metric, so like every other metric a rise is a regression
+        results.append({'case': 'render scaling stories=' + str(num_stories) + ' assignees=' + str(num_assignees) +
+                                ' jobs=' + str(scaling_jobs),
+                        'metrics': {'parallel_wall_ratio': round(1 / speedup, 4)},
+                        'speedup': round(speedup, 3),
+                        'sheets_speedup': round(sheets_speedup, 3),
+                        'speedup_per_process': round(speedup / scaling_jobs, 3),
+                        'parent_fixed_secs': round(parent_fixed_secs, 6),
+                        'parent_fixed_share': round(parent_fixed_secs / parallel_rec['metrics']['wall_secs'], 4),
+                        'cpu_count': os.cpu_count()})
+
+    return results
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def measure_report_imports(script_args: list[str]) -> tuple[float, list[str], str]:
+    # run the report script under python -X importtime, returns the total time of the top level imports in ms, the
+    # heavy modules that were imported and the script's output
+    completed = subprocess.run([sys.executable, '-X', 'importtime', str(REPORT_SCRIPT_PATH)] + script_args,
+                               stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    import_us = 0
+    heavy_modules = []
+    for import_line in completed.stderr.splitlines():
+        if not import_line.startswith('import time:') or import_line.count('|') != 2:
+            continue
+        cumulative_us, module_name = import_line.split('|')[1:]
+        if not cumulative_us.strip().isdecimal():
+            continue  # the column header line
+        if not module_name.startswith('  '):
+            import_us += int(cumulative_us)
+        if module_name.strip().split('.')[0] in HEAVY_MODULES:
+            heavy_modules.append(module_name.strip())
+
+    return import_us / 1000, heavy_modules, completed.stdout
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def measure_report_run(script_args: list[str], repeats: int) -> float:
+    # best wall time of running the report script to completion
+    run_secs = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, str(REPORT_SCRIPT_PATH)] + script_args, stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        run_secs.append(time.perf_counter() - start_time)
+
+    return min(run_secs)
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def measure_time_to_prompt(repeats: int) -> float:
+    # best time from starting the report script to its sprint number prompt, input() flushes the prompt to the pipe
+    prompt_secs = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        report_process = subprocess.Popen([sys.executable, str(REPORT_SCRIPT_PATH)], stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        report_output = b''
+        while b'==> ' not in report_output:
+            output_chunk = os.read(report_process.stdout.fileno(), 4096)
+            if not output_chunk:
+                break
+            report_output += output_chunk
+        prompt_secs.append(time.perf_counter() - start_time)
+        report_process.kill()
+        report_process.wait()
+        report_process.stdout.close()
+        report_process.stdin.close()
+        if b'==> ' not in report_output:
+            raise RuntimeError('the report script exited without prompting for a sprint number')
+
+    return min(prompt_secs)
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def benchmark_startup(import_budget_ms: float, noop_sprint: int | None, repeats: int) -> list[dict]:
+    # startup cost of the report script run from the current folder: the imports of --help checked against a budget
+    # and for heavy modules, the time to the sprint number prompt and, given a sprint whose report is up to date with
+    # the input files here, the time of a run that has nothing to do
+    results = []
+
+    print('\n   Startup benchmark, best of ' + str(repeats) + ', import budget ' + str(import_budget_ms) + ' ms')
+    print('   {:<40}  {:>10}  {:>10}  {}'.format('Case', 'Imports ms', 'Wall (s)', 'Heavy modules'))
+    startup_cases = [('--help', ['--help']), ('--validate', ['--validate']), ('time to first prompt', None)]
+    if noop_sprint is not None:
+        # the first run builds the report if it isn't up to date yet
+        measure_report_run(['--sprint', str(noop_sprint)], 1)
+        startup_cases.append(('up to date run, sprint ' + str(noop_sprint), ['--sprint', str(noop_sprint)]))
+    for case_name, script_args in startup_cases:
+        if script_args is None:
+            # without a sprint number the script prompts for one, with stdin closed it stops at the prompt, so the
+            # imports are the ones made before the prompt shows
+            import_ms, heavy_modules, script_output = measure_report_imports([])
+            if '==> ' not in script_output:
+                heavy_modules.append('(no sprint number prompt)')
+            wall_secs = measure_time_to_prompt(repeats)
+        else:
+            import_ms, heavy_modules, script_output = measure_report_imports(script_args)
+            if noop_sprint is not None and script_args[0] == '--sprint' and 'up to date' not in script_output:
+                heavy_modules.append('(the report was rebuilt, not skipped)')
+            wall_secs = measure_report_run(script_args, repeats)
+        within_budget = import_ms <= import_budget_ms and not heavy_modules
+        print('   {:<40}  {:>10.1f}  {:>10.3f}  {}{}'.format(case_name, import_ms, wall_secs,
+                                                             ', '.join(heavy_modules) or '-',
+                                                             '' if within_budget else '  OVER BUDGET'))
+        results.append({'case': 'startup ' + case_name,
+                        'metrics': {'wall_secs': round(wall_secs, 6)},
+                        'import_ms': round(import_ms, 1),
+                        'heavy_modules': heavy_modules,
+                        'within_budget': within_budget})
+
+    return results
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def save_benchmark_baseline(baseline_path: Path, results: list[dict]) -> None:
+    baseline_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(baseline_path, 'w') as baseline_file:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                   'command': sys.argv,
+                   'python': platform.python_version(),
+                   'machine': platform.platform(),
+                   'results': results}, baseline_file, indent=2)
+    print('\n   Saved benchmark baseline ' + str(baseline_path))
+
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def compare_with_benchmark_baseline(baseline_path: Path, results: list[dict], tolerance_pct: float) -> bool:
+    # every metric is a time or a size, so a rise of more than tolerance_pct over the baseline is a regression
+    # cases that are only in one of the two runs are skipped
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    baseline_metrics = {result_rec['case']: result_rec['metrics'] for result_rec in baseline['results']}
+
+    print('\n   Compared with baseline ' + str(baseline_path) + ' from ' + baseline['created'])
+    print('   {:<84}  {:>12}  {:>12}  {:>8}'.format('Case / metric', 'Baseline', 'Now', 'Change'))
+    no_regressions = True
+    for result_rec in results:
+        if result_rec['case'] not in baseline_metrics:
+            continue
+        for metric_name, metric_value in result_rec['metrics'].items():
+            baseline_value = baseline_metrics[result_rec['case']].get(metric_name)
+            if not baseline_value:
+                continue
+            change_pct = (metric_value - baseline_value) / baseline_value * 100
+            status_text = ''
+            if change_pct > tolerance_pct:
+                status_text = '  REGRESSION'
+                no_regressions = False
+            print('   {:<84}  {:>12.4f}  {:>12.4f}  {:>+7.1f}%{}'.format(result_rec['case'] + ' ' + metric_name,
+                                                                         baseline_value, metric_value, change_pct,
+                                                                         status_text))
+
+    return no_regressions
+
+
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+# * Main
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for Create FAST IPM Planning Report')
+    parser.add_argument('--suite', choices=('all', 'grouping', 'velocity', 'memory', 'pipeline', 'scaling',
+                                            'startup'),
+                        default='all',
+                        help='which benchmark to run (default: %(default)s)')
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000',
+                        help='comma separated story counts to benchmark (default: %(default)s)')
+    parser.add_argument('--pipeline-sizes', default='1000,10000,100000',
+                        help='comma separated story counts for the end to end pipeline (default: %(default)s)')
+    parser.add_argument('--assignees', type=int, default=300,
+                        help='number of distinct assignees (default: %(default)s)')
+    parser.add_argument('--sprints', type=int, default=60,
+                        help='number of sprints in the synthetic sprint dates table (default: %(default)s)')
+    parser.add_argument('--summary-len', type=int, default=None,
+                        help='pad or cut every pipeline story summary to this many characters')
+    parser.add_argument('--output-mode', choices=('in-memory', 'streaming'), default='in-memory',
+                        help='how the pipeline writes the workbook (default: %(default)s)')
+    parser.add_argument('--render-jobs', type=int, default=1,
+                        help='worker processes rendering the pipeline assignee worksheets (default: %(default)s)')
+    parser.add_argument('--scaling-jobs', type=int, default=os.cpu_count(),
+                        help='render processes the scaling suite compares with writing the sheets in one process '
+                             '(default: %(default)s)')
+    parser.add_argument('--formats', default='xlsx',
+                        help='comma separated output formats the pipeline writes (default: %(default)s)')
+    parser.add_argument('--import-budget-ms', type=float, default=100.0,
+                        help='most the top level imports of --help and --validate may take (default: %(default)s)')
+    parser.add_argument('--noop-sprint', type=int,
+                        help='also time an up to date run of this sprint, using the input files in the current folder')
+    parser.add_argument('--startup-repeats', type=int, default=5,
+                        help='runs of each startup case, the best is kept (default: %(default)s)')
+    parser.add_argument('--linear-limit', type=int, default=100000,
+                        help='largest story count to also run the old linear scan for (default: %(default)s)')
+    parser.add_argument('--save-baseline', nargs='?', const=BENCHMARK_BASELINE_PATH, type=Path, metavar='FILE',
+                        help='save the results as the baseline (default file: ' + str(BENCHMARK_BASELINE_PATH) + ')')
+    parser.add_argument('--compare', nargs='?', const=BENCHMARK_BASELINE_PATH, type=Path, metavar='FILE',
+                        help='compare the results with a saved baseline and exit with status 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=15.0,
+                        help='percent a metric may rise over the baseline before it counts as a regression '
+                             '(default: %(default)s)')
+    args = parser.parse_args()
+    if args.sprints < 4:
+        parser.error('--sprints must be at least 4')
+
+    report_module = load_report_module()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = []
+    if args.suite in ('all', 'grouping'):
+        results += benchmark_grouping(report_module, sizes, args.assignees, args.linear_limit)
+    if args.suite in ('all', 'velocity'):
+        results += benchmark_velocity(report_module, sizes, args.assignees)
+    if args.suite in ('all', 'memory'):
+        results += benchmark_story_memory(report_module, sizes, args.assignees)
+    if args.suite in ('all', 'pipeline'):
+        pipeline_sizes = [int(size) for size in args.pipeline_sizes.split(',')]
+        results += benchmark_pipeline(report_module, pipeline_sizes, args.assignees, args.sprints, args.summary_len,
+                                      args.output_mode, args.render_jobs,
+                                      report_module.parse_output_formats(args.formats))
+    if args.suite in ('all', 'scaling'):
+        results += benchmark_render_scaling(report_module, [int(size) for size in args.pipeline_sizes.split(',')],
+                                            args.assignees, args.sprints, args.summary_len, args.scaling_jobs)
+
+    if args.suite in ('all', 'startup'):
+        results += benchmark_startup(args.import_budget_ms, args.noop_sprint, args.startup_repeats)
+
+    # the startup budget is checked on every run, not only against a baseline
+    no_regressions = all(result_rec.get('within_budget', True) for result_rec in results)
+    if args.compare:
+        no_regressions = compare_with_benchmark_baseline(args.compare, results, args.tolerance) and no_regressions
+    if args.save_baseline:
+        save_benchmark_baseline(args.save_baseline, results)
+    if not no_regressions:
+        sys.exit(1)
+
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+from __future__ import annotations
 
 
 # **********************************************************************************************************************
@@ -8,20 +9,117 @@
 # **********************************************************************************************************************
 
 # Standard library imports
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import pickle
+import shutil
+import struct
+import sys
+import time
+import tracemalloc
+import zipfile
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
+from typing import TYPE_CHECKING
 
 
 # Third party imports
-import xlsxwriter
+# xlsxwriter is imported by create_ss_workbook_and_formats(), so the csv, json and parquet outputs don't need it
 
 
 # local application imports
 
 
 # SGM Shared Module imports
-from kclGetJiraSprintDates_2 import SprintDateData
-from kclGetJiraSprintXlsxData_1 import JiraSprintData, JiraStoryRec
+# the shared modules and the spreadsheet reader they use are imported by parse_sprint_date_index() and
+# parse_jira_story_store(), so --help, --validate and an up to date run never load them
+if TYPE_CHECKING:
+    from kclGetJiraSprintDates_2 import SprintDateData
+
+
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+# * Constants
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+
+# the input spreadsheets, see load_sprint_date_index() and load_jira_story_data()
+INPUT_FILES_DIR = Path.cwd() / 'Input files'
+SPRINT_DATES_PATH = INPUT_FILES_DIR / 'FAST Sprint Start-End Dates.xlsx'
+JIRA_STORY_DATA_PATH = INPUT_FILES_DIR / 'Jira Sprint Planning Data.xlsx'
+
+# parsed input files are cached here as pickles, bump INPUT_CACHE_VERSION whenever the cached objects change shape
+INPUT_CACHE_DIR = Path.cwd() / 'Cache files'
+INPUT_CACHE_VERSION = 4
+INPUT_CACHE_MAX_MB = 512
+# what each single sprint report was last built from, so an up to date report can be skipped without reading the input
+RUN_STAMPS_FILE_NAME = 'run stamps.json'
+
+# sprint numbers are looked up in the sprint dates workbook from 1 until this many numbers in a row, counted from the
+# last sprint found, aren't in it, see build_sprint_date_index()
+SPRINT_NUMBER_GAP_LIMIT = 100
+
+# the date fields of a kclGetJiraSprintXlsxData_1.JiraStoryRec, only there when the Jira export has the Created and
+# Resolved columns, without them the created_sprint and resolved_sprint columns of the outputs are empty
+JIRA_CREATED_DATE_FIELD = 'created_date'
+JIRA_RESOLUTION_DATE_FIELD = 'resolution_date'
+
+# bump REPORT_MANIFEST_VERSION whenever the layout of an assignee worksheet changes, so no old sheets are reused
+REPORT_MANIFEST_VERSION = 1
+# lines shown for each kind of story change in the incremental change summary
+CHANGE_SUMMARY_LIMIT = 50
+
+# output formats that can be asked for with --formats, see create_ipm_planning_report()
+REPORT_OUTPUT_FORMATS = ('xlsx', 'csv', 'json', 'parquet')
+# columns of the csv, json and parquet outputs, the columns of an assignee worksheet followed by the sprints the
+# story was created and resolved in
+REPORT_FIELDS = ('key', 'issue_type', 'summary', 'assignee', 'status', 'priority', 'initial_story_points',
+                 'carryover_story', 'remaining_story_points', 'final_story_points', 'sprints_carried',
+                 'created_sprint', 'resolved_sprint')
+# stories buffered into each row group of the parquet output
+PARQUET_ROW_GROUP_SIZE = 65536
+
+# the private xlsxwriter methods render_assignee_worksheet() and fix_ss_format_xf_indices() call, no xlsxwriter version
+# is pinned so they are checked for by can_render_worksheets() before the assignee sheets are rendered
+XLSXWRITER_RENDER_METHODS = (('format', 'Format', '_get_xf_index'), ('worksheet', 'Worksheet', '_opt_reopen'),
+                             ('worksheet', 'Worksheet', '_write_single_row'),
+                             ('worksheet', 'Worksheet', '_set_filehandle'),
+                             ('worksheet', 'Worksheet', '_assemble_xml_file'))
+# the zip records write_raw_zip() writes, laid out as in the .ZIP File Format Specification (APPNOTE.TXT), without zip64
+ZIP_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+ZIP_CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+ZIP_END_RECORD = struct.Struct('<4s4H2LH')
+# the compression level xlsxwriter's zip file uses, the rendered worksheets are compressed the same way
+WORKSHEET_DEFLATE_LEVEL = zlib.Z_DEFAULT_COMPRESSION
+
+# number of sprints averaged for the rolling velocity in the Velocity worksheet
+VELOCITY_WINDOW = 3
+
+# how --teams splits one Jira export into teams, see partition_stories_by_team()
+TEAM_FIELDS = ('sprint-prefix', 'project')
+# a team's own sprint dates are read from 'Input files/<team> Sprint Start-End Dates.xlsx' when there is one, other
+# teams use the sprints of SPRINT_DATES_PATH under their own sprint prefix
+TEAM_SPRINT_DATES_SUFFIX = ' Sprint Start-End Dates.xlsx'
+
+# parsed input shared with the batch and team worker processes, set once per worker by init_report_worker()
+batch_worker_state: dict = {}
+
+# story data shared with the worksheet render worker processes, set once per worker by init_render_worker()
+render_worker_state: dict = {}
+
+# per story output is only shown at the debug level (--debug)
+log = logging.getLogger('ipm_planning')
 
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -38,22 +136,145 @@ class SprintInfo:
         self.end_date: datetime = end_date_in
 
 
+class SprintDateIndex:
+    # the sprints of the sprint dates workbook as parallel lists sorted by start date, searched with bisect. Sprints
+    # don't overlap, so the end dates are sorted too. The sprint numbers are also kept sorted, with the row of each
+    # sprint in the date sorted lists, for the lookups by number
+    def __init__(self):
+        self.start_days: list[date] = []
+        self.end_days: list[date] = []
+        self.numbers: list[int] = []
+        self.sprint_infos: list[SprintInfo] = []
+        self.sorted_numbers: list[int] = []
+        self.number_rows: list[int] = []
+
+    def __len__(self):
+        return len(self.numbers)
+
+
 class SprintData:
     def __init__(self):
         self.number: int = 0
-        self.cur_sprint: SprintInfo | None
-        self.prev_sprint: SprintInfo | None
-        self.story_data: JiraSprintData | None
+        self.cur_sprint: SprintInfo | None = None
+        self.prev_sprint: SprintInfo | None = None
+        self.sprint_dates: SprintDateIndex | None = None
+        self.report_name: str = ''  # names the output files, the sprint name unless the report is for a project
+        self.story_data: StoryStore | None = None
+        self.story_rows: list[int] | None = None  # rows of story_data in this sprint's report, None means every row
+        self.sprint_history: SprintHistoryIndex | None = None
+        self.sprint_names: dict[int, str] = {}
+        self.assignees: list[AssigneesRec] | None = None  # set by create_ipm_planning_report(), with the point totals
+
+
+class StoryStore:
+    # the Jira stories held column by column, a story is a row index into the columns. The repeated values (issue
+    # type, assignee, status, priority and sprint lists) are interned so each distinct value is stored only once
+    def __init__(self):
+        self.key: list[str] = []
+        self.issue_type: list[str] = []
+        self.summary: list[str] = []
+        self.assignee: list[str] = []
+        self.status: list[str] = []
+        self.priority: list[str] = []
+        self.sprints: list[tuple[str, ...]] = []
+        self.story_points: array = array('d')
+        self.created_date: list[datetime | None] = []
+        self.resolution_date: list[datetime | None] = []
+        # set once the sprint dates are known by map_story_dates_to_sprints(), 0 when a date is in no sprint
+        self.created_sprint: array = array('H')
+        self.resolved_sprint: array = array('H')
+        # set per sprint being planned by create_ipm_planning_report()
+        self.carry_over: bytearray = bytearray()  # 1 for a carry over story, 0 for a new story
+        self.sprints_carried: array = array('H')
+
+    def __len__(self):
+        return len(self.key)
 
 
 class AssigneesRec:
-    def __init__(self, assignee_in, jira_story_in, story_points_in):
+    def __init__(self, assignee_in, story_row_in: int, story_points_in):
         self.assignee: str = assignee_in
-        self.stories: list = [jira_story_in]
+        self.story_rows: array = array('l', [story_row_in])  # rows of this assignee's stories in the StoryStore
         self.total_points: int = story_points_in
+        # values of the totals row formulas in the assignee worksheet, set by calc_assignee_point_totals()
+        self.initial_points_total = 0
+        self.final_points_total = 0
         self.ws = None
 
 
+class SprintHistoryIndex:
+    def __init__(self, sprint_prefix_in: str | None):
+        self.sprint_prefix: str | None = sprint_prefix_in  # None when the sprints were matched by their full names
+        # StoryStore row -> bitmap of the sprint numbers the story has been in, bit n set means sprint n
+        self.story_sprints: list[int] = []
+        self.story_rows: list[int] | None = None  # StoryStore rows the index was built from, None means every row
+        # sprint number -> StoryStore rows of the stories that have been in that sprint, in row order
+        self.sprint_stories: dict[int, list[int]] = {}
+
+
+class VelocityTable:
+    def __init__(self, assignees_in: list[str], sprint_numbers_in: list[int], sprint_names_in: list[str]):
+        self.assignees: list[str] = assignees_in
+        self.sprint_numbers: list[int] = sprint_numbers_in
+        self.sprint_names: list[str] = sprint_names_in
+        # NumPy arrays of shape (assignees, sprints)
+        self.committed_points = None
+        self.carry_over_points = None
+        self.carry_over_rate = None
+        self.completed_points = None
+        self.rolling_velocity = None
+
+
+class TeamRec:
+    def __init__(self, name_in: str):
+        self.name: str = name_in
+        self.story_rows: list[int] = []  # in row order
+        self.prefix_counts: dict[str, int] = {}  # stories by the sprint prefix of their last sprint
+        self.sprint_prefix: str | None = None  # the prefix most of the team's stories were last in
+        self.sprint_date_index: SprintDateIndex | None = None
+
+
+class ReportOptions:
+    def __init__(self):
+        self.output_formats: list[str] = ['xlsx']  # any of REPORT_OUTPUT_FORMATS
+        self.streaming: bool = False  # write the workbook with xlsxwriter's constant_memory mode
+        self.velocity: bool = False  # add the Velocity worksheet
+        self.verify: bool = False  # cross check the workbook totals against the story data
+        self.profile_path: Path | None = None  # write a run profile of every stage to this .json or .csv file
+        self.debug: bool = False  # show per story output
+        self.incremental: bool = False  # only render the assignee sheets that changed since the last run
+        self.render_jobs: int = 1  # worker processes rendering the assignee worksheets, 1 renders them in this process
+
+
+class RunProfile:
+    def __init__(self):
+        self.enabled: bool = False
+        self.trace_memory: bool = False
+        self.label: str = ''  # sprint being planned, recorded with each stage
+        self.stages: list[dict] = []
+
+
+class InputCache:
+    def __init__(self, cache_dir_in: Path = INPUT_CACHE_DIR, max_mb_in: int = INPUT_CACHE_MAX_MB,
+                 enabled_in: bool = True):
+        self.cache_dir: Path = cache_dir_in
+        self.max_bytes: int = max_mb_in * 1024 * 1024
+        self.enabled: bool = enabled_in
+
+
+class StoryGroups:
+    def __init__(self, group_field_in: str = 'assignee'):
+        self.group_field: str = group_field_in
+        # dict keeps insertion order, so the groups come back in the order each key was first seen
+        self.index: dict[str, AssigneesRec] = {}
+
+    def __iter__(self):
+        return iter(self.index.values())
+
+    def __len__(self):
+        return len(self.index)
+
+
 class IpmPlanningSS:
     def __init__(self):
         self.workbook = None
@@ -63,6 +284,13 @@ class IpmPlanningSS:
         self.right_fmt = None
         self.center_fmt = None
         self.assignees: list = []
+        self.story_store: StoryStore | None = None
+        self.streaming: bool = False
+        self.output_path: str = ''  # the workbook is written to workbook.filename and renamed to this when finished
+
+
+# stage timings for the --profile run profile, stays disabled unless a profile was asked for
+run_profile = RunProfile()
 
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -72,11 +300,79 @@ class IpmPlanningSS:
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def create_ss_workbook_and_formats(sprint_to_plan: str) -> IpmPlanningSS:
+def enable_run_profile(trace_memory: bool = True) -> None:
+    run_profile.enabled = True
+    run_profile.trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    return None
 
-    # create the IPM Planning spreadsheet data structure and then create spreadsheet workbook
-    ipm_planning_ss = IpmPlanningSS()
-    ipm_planning_ss.workbook = xlsxwriter.Workbook('Output files/' + sprint_to_plan + ' IPM Planning.xlsx')
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+@contextmanager
+def profile_stage(stage_name: str):
+    # record the wall time, CPU time and peak traced memory of the code run inside the with block
+    if not run_profile.enabled:
+        yield
+        return
+
+    if run_profile.trace_memory:
+        tracemalloc.reset_peak()
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    try:
+        yield
+    finally:
+        stage_rec = {'sprint': run_profile.label,
+                     'stage': stage_name,
+                     'wall_secs': round(time.perf_counter() - start_wall_time, 6),
+                     'cpu_secs': round(time.process_time() - start_cpu_time, 6),
+                     'peak_mem_kb': None}
+        if run_profile.trace_memory:
+            stage_rec['peak_mem_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        run_profile.stages.append(stage_rec)
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def write_run_profile(profile_path: Path, stages: list[dict]) -> None:
+    # a .csv profile has one row per stage, anything else is written as a JSON document
+    profile_path.parent.mkdir(parents=True, exist_ok=True)
+    if profile_path.suffix.lower() == '.csv':
+        with open(profile_path, 'w', newline='') as profile_file:
+            profile_writer = csv.DictWriter(profile_file, fieldnames=['sprint', 'stage', 'wall_secs', 'cpu_secs',
+                                                                      'peak_mem_kb'])
+            profile_writer.writeheader()
+            profile_writer.writerows(stages)
+    else:
+        with open(profile_path, 'w') as profile_file:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                       'command': sys.argv,
+                       'total_wall_secs': round(sum(stage_rec['wall_secs'] for stage_rec in stages), 6),
+                       'stages': stages}, profile_file, indent=2)
+    print('   Wrote run profile ' + str(profile_path))
+
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def create_ss_workbook_and_formats(sprint_to_plan: str, streaming: bool = False,
+                                   ipm_planning_ss: IpmPlanningSS | None = None,
+                                   fix_xf_indices: bool = False) -> IpmPlanningSS:
+    # xlsxwriter is only needed for the xlsx output, so it is only imported when a workbook is created
+    import xlsxwriter
+
+    # create the IPM Planning spreadsheet data structure, unless one was passed in, and then create spreadsheet workbook
+    # in streaming mode xlsxwriter's constant_memory option flushes each row to disk as soon as the next row is
+    # started, so every worksheet must be written strictly top to bottom
+    # the workbook is written to a temporary file next to the output file and only renamed to the output file by
+    # finish_report_workbook() once it is complete, so nobody can open a half written workbook
+    if ipm_planning_ss is None:
+        ipm_planning_ss = IpmPlanningSS()
+    ipm_planning_ss.streaming = streaming
+    ipm_planning_ss.output_path = get_report_output_path(sprint_to_plan, '.xlsx')
+    ipm_planning_ss.workbook = xlsxwriter.Workbook(ipm_planning_ss.output_path + '.tmp',
+                                                   {'constant_memory': streaming})
 
     # add predefined formats to be used for formatting cells in the spreadsheet
     ipm_planning_ss.left_fmt = ipm_planning_ss.workbook.add_format({
@@ -132,10 +428,52 @@ def create_ss_workbook_and_formats(sprint_to_plan: str) -> IpmPlanningSS:
         'align': 'center',
         'bold': 1,
     })
+    # only the render path needs the format numbering fixed, the private method it takes is left alone otherwise
+    if fix_xf_indices:
+        fix_ss_format_xf_indices(ipm_planning_ss)
 
     return ipm_planning_ss
 
 
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def can_render_worksheets() -> bool:
+    # True when the installed xlsxwriter still has every private method the worksheet render path relies on
+    import importlib
+
+    for module_name, class_name, method_name in XLSXWRITER_RENDER_METHODS:
+        xlsxwriter_class = getattr(importlib.import_module('xlsxwriter.' + module_name), class_name, None)
+        if not callable(getattr(xlsxwriter_class, method_name, None)):
+            return False
+
+    return True
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def fix_ss_format_xf_indices(ipm_planning_ss: IpmPlanningSS) -> None:
+    # xlsxwriter numbers each format the first time a cell uses it, number them all up front in a fixed order so a
+    # worksheet rendered in a worker process refers to the same styles as the workbook it is assembled into
+    for cell_fmt in (ipm_planning_ss.left_fmt, ipm_planning_ss.left_bold_fmt, ipm_planning_ss.left_lv2_fmt,
+                     ipm_planning_ss.right_fmt, ipm_planning_ss.center_fmt, ipm_planning_ss.percent_fmt,
+                     ipm_planning_ss.header_fmt, ipm_planning_ss.last_row_fmt, ipm_planning_ss.totals_fmt):
+        cell_fmt._get_xf_index()
+
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def get_report_output_path(sprint_to_plan: str, suffix: str) -> str:
+    # e.g. 'Output files/FASTR1i45 IPM Planning.xlsx', with an empty suffix it is the folder of the csv output
+    return 'Output files/' + sprint_to_plan + ' IPM Planning' + suffix
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def finish_report_workbook(ipm_planning_ss: IpmPlanningSS) -> None:
+    # the rename is atomic, anyone opening the output file gets either the previous workbook or the complete new one
+    os.replace(ipm_planning_ss.workbook.filename, ipm_planning_ss.output_path)
+
+    return None
+
+
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 def create_assignee_worksheet(ipm_planning_ss: IpmPlanningSS) -> None:
 
@@ -160,30 +498,93 @@ def create_assignee_worksheet(ipm_planning_ss: IpmPlanningSS) -> None:
 
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def update_planning_spreadsheet_assignees_stories(assignees_list: list[AssigneesRec],
-                                                  jira_story_rec_in: JiraStoryRec,
-                                                  jira_story_assignee_in) -> None:
-    new_assignees_list = False
-    if assignees_list:  # Check to see if the assignees list of assignees is empty
-        new_assignee_in_list = True  # the assignees list is not empty, but this may be a new assignee to add to the list
-        # iterate thru the assignees list checking to see if this assignee already has a record in the list
-        for cur_assignees_rec in assignees_list:
-            if cur_assignees_rec.assignee == jira_story_assignee_in:
-                # this assignee already exists, so update the data for this assignee
-                new_assignee_in_list = False  # assignee found, so not a new assignee for the list
-                cur_assignees_rec.stories.append(jira_story_rec_in)  # add story to this assignees list of stories
-                cur_assignees_rec.total_points += jira_story_rec_in.story_points
+def intern_text(text_in):
+    # Jira leaves some fields empty, only strings can be interned
+    if isinstance(text_in, str):
+        return sys.intern(text_in)
+
+    return text_in
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def build_story_store(story_data) -> StoryStore:
+    # copy the story records into the columns of a StoryStore, once this is done the records can be freed
+    story_store = StoryStore()
+    sprint_lists = {}
+    date_fields = None
+    for jira_story_rec in story_data:
+        if date_fields is None:
+            # every record of an export has the same fields, so look for the date fields once on the first record
+            date_fields = [field_name for field_name in (JIRA_CREATED_DATE_FIELD, JIRA_RESOLUTION_DATE_FIELD)
+                           if hasattr(jira_story_rec, field_name)]
+            for field_name in (JIRA_CREATED_DATE_FIELD, JIRA_RESOLUTION_DATE_FIELD):
+                if field_name not in date_fields:
+                    print('   The Jira stories have no ' + field_name + ' field, so the ' +
+                          ('created_sprint' if field_name == JIRA_CREATED_DATE_FIELD else 'resolved_sprint') +
+                          ' column of the outputs is empty')
+        story_store.key.append(jira_story_rec.key)
+        story_store.issue_type.append(intern_text(jira_story_rec.issue_type))
+        story_store.summary.append(jira_story_rec.summary)
+        story_store.assignee.append(intern_text(jira_story_rec.assignee))
+        story_store.status.append(intern_text(jira_story_rec.status))
+        story_store.priority.append(intern_text(jira_story_rec.priority))
+        sprints = tuple(intern_text(sprint_name) for sprint_name in jira_story_rec.sprints)
+        story_store.sprints.append(sprint_lists.setdefault(sprints, sprints))
+        story_store.story_points.append(jira_story_rec.story_points)
+        story_store.created_date.append(
+            getattr(jira_story_rec, JIRA_CREATED_DATE_FIELD) if JIRA_CREATED_DATE_FIELD in date_fields else None)
+        story_store.resolution_date.append(
+            getattr(jira_story_rec, JIRA_RESOLUTION_DATE_FIELD) if JIRA_RESOLUTION_DATE_FIELD in date_fields else None)
+    story_store.created_sprint = array('H', bytes(2 * len(story_store)))
+    story_store.resolved_sprint = array('H', bytes(2 * len(story_store)))
+    story_store.carry_over = bytearray(len(story_store))
+    story_store.sprints_carried = array('H', bytes(2 * len(story_store)))
+
+    return story_store
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def parse_jira_story_store(jira_sprint_planning_data_path: Path) -> StoryStore:
+    from kclGetJiraSprintXlsxData_1 import JiraSprintData
+
+    return build_story_store(JiraSprintData(jira_sprint_planning_data_path))
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def update_planning_spreadsheet_assignees_stories(story_groups: StoryGroups,
+                                                  story_row_in: int,
+                                                  jira_story_assignee_in,
+                                                  story_points_in) -> None:
+    # constant time lookup of the group for this assignee (or whatever field the stories are grouped by)
+    cur_assignees_rec = story_groups.index.get(jira_story_assignee_in)
+    if cur_assignees_rec is None:
+        # this is a new assignee for the groups, so create a new assignees rec
+        story_groups.index[jira_story_assignee_in] = AssigneesRec(jira_story_assignee_in, story_row_in,
+                                                                  story_points_in)
     else:
-        # This is a new sprint for the sprints list
-        new_assignee_in_list = True
-    if new_assignees_list or new_assignee_in_list:
-        # The assignees list is empty or this is a new assignee for the assignees list, so create a new assignees rec
-        new_assignees_rec = AssigneesRec(jira_story_assignee_in, jira_story_rec_in, jira_story_rec_in.story_points)
-        assignees_list.append(new_assignees_rec)
+        # this assignee already exists, so update the running totals for this assignee
+        cur_assignees_rec.story_rows.append(story_row_in)
+        cur_assignees_rec.total_points += story_points_in
 
     return None
 
 
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def group_stories_by_field(story_store: StoryStore, group_field: str = 'assignee',
+                           story_rows=None) -> list[AssigneesRec]:
+    # single pass over the stories building one AssigneesRec per distinct value of group_field (assignee, status,
+    # priority, issue_type, ...), the groups are returned in the order each value was first seen
+    story_groups = StoryGroups(group_field)
+    group_col = getattr(story_store, group_field)
+    if story_rows is None:
+        story_rows = range(len(story_store))
+    for story_row in story_rows:
+        update_planning_spreadsheet_assignees_stories(story_groups, story_row, group_col[story_row],
+                                                      story_store.story_points[story_row])
+
+    return list(story_groups)
+
+
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 def calc_table_starting_and_ending_cells(top_row: int, left_col, right_col, num_data_rows) -> str:
     top_left_cell = left_col + str(top_row)
@@ -194,15 +595,15 @@ def calc_table_starting_and_ending_cells(top_row: int, left_col, right_col, num_
 
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def create_sprint_report_spreadsheet(stories_by_assignee: list[AssigneesRec], sprint_to_plan: str) -> IpmPlanningSS:
+def create_sprint_report_spreadsheet(ipm_planning_ss: IpmPlanningSS, sprint_to_plan: str,
+                                     streaming: bool = False, fix_xf_indices: bool = False) -> None:
 
     print('\n   Creating IPM Planning spreadsheet')
-    # create the spreadsheet workbook and formats for the IPM Planning spreadsheet
-    ipm_planning_ss = create_ss_workbook_and_formats(sprint_to_plan)
+    # add the spreadsheet workbook and formats for the IPM Planning spreadsheet to the report data
+    create_ss_workbook_and_formats(sprint_to_plan, streaming, ipm_planning_ss, fix_xf_indices)
 
-    ipm_planning_ss.assignees = stories_by_assignee
-
-    # Setup the All Assignees worksheet tab to hold the totals by Assignee
+    # Setup the All Assignees worksheet tab to hold the totals by Assignee, the assignee worksheets are added after it
+    # by write_ipm_planning_data_to_spreadsheet() so that each one is written top to bottom in a single pass
     ipm_planning_ss.assignee_total_ws = ipm_planning_ss.workbook.add_worksheet('All Assignees')
     ipm_planning_ss.assignee_total_ws.set_column('A:A', 20)
     ipm_planning_ss.assignee_total_ws.write('A1', 'Assignee', ipm_planning_ss.header_fmt)
@@ -210,88 +611,950 @@ def create_sprint_report_spreadsheet(stories_by_assignee: list[AssigneesRec], sp
     ipm_planning_ss.assignee_total_ws.write('B1', 'Initial Story Points', ipm_planning_ss.header_fmt)
     ipm_planning_ss.assignee_total_ws.write('C1', 'Final Story Points', ipm_planning_ss.header_fmt)
 
-    # create the worksheet and table layouts for the Metrics tab in the IPM Planning spreadsheet
-    for cur_assignee in ipm_planning_ss.assignees:
-        cur_assignee.ws = ipm_planning_ss.workbook.add_worksheet(cur_assignee.assignee)
+    return None
 
-        # Write out the worksheet header
-        cur_assignee.ws.set_column('A:A', 12)
-        cur_assignee.ws.write('A1', 'Key', ipm_planning_ss.header_fmt)
 
-        cur_assignee.ws.set_column('B:B', 9, ipm_planning_ss.center_fmt)
-        cur_assignee.ws.write('B1', 'Issue Type', ipm_planning_ss.header_fmt)
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def write_assignee_worksheet_header(ipm_planning_ss: IpmPlanningSS, cur_assignee: AssigneesRec) -> None:
 
-        cur_assignee.ws.set_column('C:C', 70, ipm_planning_ss.center_fmt)
-        cur_assignee.ws.write('C1', 'Summary', ipm_planning_ss.header_fmt)
+    # create the worksheet for this assignee and write out the worksheet header
+    cur_assignee.ws = ipm_planning_ss.workbook.add_worksheet(cur_assignee.assignee)
 
-        cur_assignee.ws.set_column('D:D', 18, ipm_planning_ss.center_fmt)
-        cur_assignee.ws.write('D1', 'Assignee', ipm_planning_ss.header_fmt)
+    cur_assignee.ws.set_column('A:A', 12)
+    cur_assignee.ws.write('A1', 'Key', ipm_planning_ss.header_fmt)
 
-        cur_assignee.ws.set_column('E:E', 14, ipm_planning_ss.center_fmt)
-        cur_assignee.ws.write('E1', 'Status', ipm_planning_ss.header_fmt)
-        cur_assignee.ws.set_column('F:F', 12, ipm_planning_ss.center_fmt)
-        cur_assignee.ws.write('F1', 'Priority', ipm_planning_ss.header_fmt)
+    cur_assignee.ws.set_column('B:B', 9, ipm_planning_ss.center_fmt)
+    cur_assignee.ws.write('B1', 'Issue Type', ipm_planning_ss.header_fmt)
 
-        cur_assignee.ws.set_column('G:J', 12, ipm_planning_ss.center_fmt)
-        cur_assignee.ws.write('G1', 'Initial Story Points', ipm_planning_ss.header_fmt)
-        cur_assignee.ws.write('H1', 'Carryover Story', ipm_planning_ss.header_fmt)
-        cur_assignee.ws.write('I1', 'Remaining Story Points', ipm_planning_ss.header_fmt)
-        cur_assignee.ws.write('J1', 'Final Story Points', ipm_planning_ss.header_fmt)
+    cur_assignee.ws.set_column('C:C', 70, ipm_planning_ss.center_fmt)
+    cur_assignee.ws.write('C1', 'Summary', ipm_planning_ss.header_fmt)
 
-    return ipm_planning_ss
+    cur_assignee.ws.set_column('D:D', 18, ipm_planning_ss.center_fmt)
+    cur_assignee.ws.write('D1', 'Assignee', ipm_planning_ss.header_fmt)
+
+    cur_assignee.ws.set_column('E:E', 14, ipm_planning_ss.center_fmt)
+    cur_assignee.ws.write('E1', 'Status', ipm_planning_ss.header_fmt)
+    cur_assignee.ws.set_column('F:F', 12, ipm_planning_ss.center_fmt)
+    cur_assignee.ws.write('F1', 'Priority', ipm_planning_ss.header_fmt)
+
+    cur_assignee.ws.set_column('G:K', 12, ipm_planning_ss.center_fmt)
+    cur_assignee.ws.write('G1', 'Initial Story Points', ipm_planning_ss.header_fmt)
+    cur_assignee.ws.write('H1', 'Carryover Story', ipm_planning_ss.header_fmt)
+    cur_assignee.ws.write('I1', 'Remaining Story Points', ipm_planning_ss.header_fmt)
+    cur_assignee.ws.write('J1', 'Final Story Points', ipm_planning_ss.header_fmt)
+    cur_assignee.ws.write('K1', 'Sprints Carried', ipm_planning_ss.header_fmt)
+
+    return None
+
+
+# ********************************************************************************************************************
+def to_day(date_in: date | datetime) -> date:
+    # the sprint dates workbook has a day for each sprint start and end, the time of a Jira date doesn't matter
+    if isinstance(date_in, datetime):
+        return date_in.date()
+
+    return date_in
 
 
 # ********************************************************************************************************************
-def review_story_sprint_history(sprint_history: list[str], sprint_to_plan: int) -> str:
+def build_sprint_date_index(jira_sprint_date_data: SprintDateData) -> SprintDateIndex:
+    # the sprint dates workbook can only be asked for a sprint by number, so every sprint number is asked for once
+    # here and every lookup after this is a binary search of the index. There is no upper limit to the sprint
+    # numbers, the asking stops once SPRINT_NUMBER_GAP_LIMIT numbers in a row after the last sprint found aren't there
+    sprint_recs = []
+    sprint_number = 0
+    last_found_number = 0
+    while sprint_number - last_found_number < SPRINT_NUMBER_GAP_LIMIT:
+        sprint_number += 1
+        jira_date_ss_rec = jira_sprint_date_data.get_sprint_data(sprint_number)
+        if jira_date_ss_rec:
+            last_found_number = sprint_number
+            sprint_recs.append((to_day(jira_date_ss_rec.start_date), to_day(jira_date_ss_rec.end_date), sprint_number,
+                                SprintInfo(jira_date_ss_rec.name, jira_date_ss_rec.start_date,
+                                           jira_date_ss_rec.end_date)))
+
+    sprint_date_index = SprintDateIndex()
+    for start_day, end_day, sprint_number, sprint_info in sorted(sprint_recs, key=lambda sprint_rec: sprint_rec[:3]):
+        sprint_date_index.start_days.append(start_day)
+        sprint_date_index.end_days.append(end_day)
+        sprint_date_index.numbers.append(sprint_number)
+        sprint_date_index.sprint_infos.append(sprint_info)
+    number_order = sorted(range(len(sprint_date_index)), key=sprint_date_index.numbers.__getitem__)
+    sprint_date_index.sorted_numbers = [sprint_date_index.numbers[sprint_row] for sprint_row in number_order]
+    sprint_date_index.number_rows = number_order
+
+    return sprint_date_index
+
+
+# ********************************************************************************************************************
+def find_sprint_by_number(sprint_date_index: SprintDateIndex, sprint_number: int) -> SprintInfo | None:
+    number_pos = bisect_left(sprint_date_index.sorted_numbers, sprint_number)
+    if number_pos < len(sprint_date_index) and sprint_date_index.sorted_numbers[number_pos] == sprint_number:
+        return sprint_date_index.sprint_infos[sprint_date_index.number_rows[number_pos]]
+
+    return None
+
+
+# ********************************************************************************************************************
+def find_sprint_by_date(sprint_date_index: SprintDateIndex, date_in: date | datetime | None) -> int | None:
+    # number of the sprint whose start to end days, inclusive, hold date_in. The last sprint starting on or before the
+    # day is the only one that can hold it, when one sprint ends on the day the next starts the next one is used
+    if date_in is None:
+        return None
+    day = to_day(date_in)
+    sprint_row = bisect_right(sprint_date_index.start_days, day) - 1
+    if sprint_row >= 0 and day <= sprint_date_index.end_days[sprint_row]:
+        return sprint_date_index.numbers[sprint_row]
+
+    return None
+
+
+# ********************************************************************************************************************
+def find_sprints_in_range(sprint_date_index: SprintDateIndex, first_date: date | datetime,
+                          last_date: date | datetime) -> list[int]:
+    # numbers of the sprints, in date order, that are at least partly between first_date and last_date inclusive
+    first_row = bisect_left(sprint_date_index.end_days, to_day(first_date))
+    end_row = bisect_right(sprint_date_index.start_days, to_day(last_date))
+
+    return sprint_date_index.numbers[first_row:end_row]
+
+
+# ********************************************************************************************************************
+def is_plannable_sprint(sprint_date_index: SprintDateIndex, sprint_number: int) -> bool:
+    # a sprint can be planned when it and the sprint before it are both in the sprint dates workbook
+    return (find_sprint_by_number(sprint_date_index, sprint_number) is not None and
+            find_sprint_by_number(sprint_date_index, sprint_number - 1) is not None)
+
 
-    prior_sprint = sprint_to_plan - 1
-    if len(sprint_history) == 0:
+# ********************************************************************************************************************
+def describe_plannable_sprints(sprint_date_index: SprintDateIndex) -> str:
+    if len(sprint_date_index) < 2:
+        return 'the Sprint Dates spreadsheet does not have two sprints to plan from'
+
+    return 'valid Sprint Numbers are between {} & {} inclusive'.format(sprint_date_index.sorted_numbers[1],
+                                                                       sprint_date_index.sorted_numbers[-1])
+
+
+# ********************************************************************************************************************
+def map_story_dates_to_sprints(story_store: StoryStore, sprint_date_index: SprintDateIndex,
+                               story_rows: list[int] | None = None) -> None:
+    # look up the sprint each story, or each of story_rows, was created and resolved in, stories share dates so each
+    # distinct date is only looked up once
+    if story_rows is None:
+        story_rows = range(len(story_store))
+    date_sprints = {None: 0}
+    for date_col, sprint_col in ((story_store.created_date, story_store.created_sprint),
+                                 (story_store.resolution_date, story_store.resolved_sprint)):
+        for story_row in story_rows:
+            story_date = date_col[story_row]
+            sprint_number = date_sprints.get(story_date)
+            if sprint_number is None:
+                sprint_number = find_sprint_by_date(sprint_date_index, story_date) or 0
+                date_sprints[story_date] = sprint_number
+            sprint_col[story_row] = sprint_number
+
+    return None
+
+
+# ********************************************************************************************************************
+def get_name_sprint_prefix(sprint_name: str) -> str:
+    # the sprint name without its sprint number, e.g. FASTR1i of FASTR1i41
+    return sprint_name.rstrip('0123456789')
+
+
+# ********************************************************************************************************************
+def rename_sprint_date_index(sprint_date_index: SprintDateIndex, sprint_prefix: str) -> SprintDateIndex:
+    # the same sprints under sprint_prefix, for a team that runs on the same sprint calendar as the sprint dates
+    # workbook, the sorted lists are shared with sprint_date_index since neither index changes after it is built
+    team_date_index = SprintDateIndex()
+    team_date_index.start_days = sprint_date_index.start_days
+    team_date_index.end_days = sprint_date_index.end_days
+    team_date_index.numbers = sprint_date_index.numbers
+    team_date_index.sorted_numbers = sprint_date_index.sorted_numbers
+    team_date_index.number_rows = sprint_date_index.number_rows
+    team_date_index.sprint_infos = [SprintInfo(sprint_prefix + str(sprint_number), sprint_info.start_date,
+                                               sprint_info.end_date)
+                                    for sprint_number, sprint_info in zip(sprint_date_index.numbers,
+                                                                          sprint_date_index.sprint_infos)]
+
+    return team_date_index
+
+
+# ********************************************************************************************************************
+def partition_stories_by_team(story_store: StoryStore, team_field: str = 'sprint-prefix') -> dict[str, TeamRec]:
+    # one pass over the stories splitting them into teams, by the sprint prefix of the last sprint each story was in or
+    # by the project of the story key, e.g. FAST of FAST-123. Stories that were never in a sprint have no sprint prefix
+    # and are left out when splitting by sprint prefix. The prefix of each distinct sprint list is only worked out once
+    teams = {}
+    sprint_list_prefixes = {}
+    for story_row, sprints in enumerate(story_store.sprints):
+        sprint_prefix = sprint_list_prefixes.get(sprints)
+        if sprint_prefix is None:
+            sprint_prefix = get_name_sprint_prefix(sprints[-1]) if sprints else ''
+            sprint_list_prefixes[sprints] = sprint_prefix
+        if team_field == 'project':
+            team_name = story_store.key[story_row].rpartition('-')[0]
+        else:
+            team_name = sprint_prefix
+        if not team_name:
+            continue
+        team_rec = teams.get(team_name)
+        if team_rec is None:
+            team_rec = teams[team_name] = TeamRec(team_name)
+        team_rec.story_rows.append(story_row)
+        if sprint_prefix:
+            team_rec.prefix_counts[sprint_prefix] = team_rec.prefix_counts.get(sprint_prefix, 0) + 1
+
+    for team_rec in teams.values():
+        team_rec.sprint_prefix = max(team_rec.prefix_counts, key=team_rec.prefix_counts.get, default=None)
+
+    return {team_name: teams[team_name] for team_name in sorted(teams)}
+
+
+# ********************************************************************************************************************
+def get_sprint_prefix(sprint_date_index: SprintDateIndex, sprint_numbers: list[int]) -> str | None:
+    # the sprint names in the sprint dates workbook are a prefix followed by the sprint number, e.g. FASTR1i41
+    for sprint_number in sprint_numbers:
+        sprint_info = find_sprint_by_number(sprint_date_index, sprint_number)
+        if sprint_info and sprint_info.name.endswith(str(sprint_number)):
+            return sprint_info.name[:-len(str(sprint_number))]
+
+    return None
+
+
+# ********************************************************************************************************************
+def build_sprint_history_index(story_store: StoryStore, sprint_prefix: str | None,
+                               story_rows: list[int] | None = None,
+                               sprint_names: dict[int, str] | None = None) -> SprintHistoryIndex:
+    # single pass over every story's sprint list, after this all sprint history questions are lookups. Stories share
+    # sprint lists, so the sprint numbers in each distinct sprint list are only worked out once. Given story_rows, in
+    # row order, only those stories are looked at and the rest are left as never having been in a sprint. Without a
+    # sprint_prefix, for sprint names that don't end in their number, a story's sprints are matched by their full
+    # names in sprint_names instead
+    sprint_history = SprintHistoryIndex(sprint_prefix)
+    sprint_history.story_sprints = [0] * len(story_store)
+    sprint_history.story_rows = story_rows
+    if story_rows is None:
+        story_rows = range(len(story_store))
+    if sprint_prefix is None:
+        sprint_name_numbers = {sprint_name: sprint_number
+                               for sprint_number, sprint_name in (sprint_names or {}).items()}
+    else:
+        prefix_len = len(sprint_prefix)
+    sprint_list_numbers = {}
+    for story_row in story_rows:
+        sprints = story_store.sprints[story_row]
+        sprint_numbers = sprint_list_numbers.get(sprints)
+        if sprint_numbers is None:
+            if sprint_prefix is None:
+                sprint_numbers = tuple(sprint_name_numbers[sprint_name] for sprint_name in sprints
+                                       if sprint_name in sprint_name_numbers)
+            else:
+                sprint_numbers = tuple(int(sprint_name[prefix_len:]) for sprint_name in sprints
+                                       if sprint_name.startswith(sprint_prefix) and
+                                       sprint_name[prefix_len:].isdecimal())
+            sprint_list_numbers[sprints] = sprint_numbers
+        sprint_bitmap = 0
+        for sprint_number in sprint_numbers:
+            sprint_bitmap |= 1 << sprint_number
+            sprint_history.sprint_stories.setdefault(sprint_number, []).append(story_row)
+        sprint_history.story_sprints[story_row] = sprint_bitmap
+
+    return sprint_history
+
+
+# ********************************************************************************************************************
+def review_story_sprint_history(sprint_history: SprintHistoryIndex, story_row: int, sprint_to_plan: int) -> str:
+
+    sprint_bitmap = sprint_history.story_sprints[story_row]
+    if sprint_bitmap == 0:
         story_history_status = 'Moved To Backlog'
+    elif sprint_bitmap >> (sprint_to_plan - 1) & 1:
+        story_history_status = 'Carryover Story'
     else:
-        prior_sprint_name = 'FASTR1i' + str(prior_sprint)
-        if prior_sprint_name in sprint_history:
-            story_history_status = 'Carryover Story'
-        else:
-            story_history_status = 'New Story'
+        story_history_status = 'New Story'
 
     return story_history_status
 
 
+# ********************************************************************************************************************
+def count_sprints_carried(sprint_history: SprintHistoryIndex, story_row: int, sprint_to_plan: int) -> int:
+    # number of back to back sprints, counting back from the sprint before sprint_to_plan, that the story was in
+    prior_sprints_mask = (1 << sprint_to_plan) - 1
+    missed_sprints = ~sprint_history.story_sprints[story_row] & prior_sprints_mask
+
+    # the highest missed sprint ends the run of consecutive sprints
+    return sprint_to_plan - missed_sprints.bit_length()
+
+
+# ********************************************************************************************************************
+def calc_story_point_formulas(story_points, carry_over_story: str) -> tuple:
+    # the values of the Remaining (col I) and Final (col J) Story Points formulas, worked out the same way as the
+    # IF() formulas written to the worksheet so the workbook can carry the results with the formulas
+    if carry_over_story == 'Y':
+        remaining_points = story_points
+    else:
+        remaining_points = ''
+    if remaining_points == '':
+        final_points = story_points
+    else:
+        final_points = remaining_points
+
+    return remaining_points, final_points
+
+
+# ********************************************************************************************************************
+def iter_assignee_report_rows(story_store: StoryStore, cur_assignees_rec: AssigneesRec):
+    # the values of each row of an assignee worksheet in REPORT_FIELDS order, carry over stories first like the
+    # worksheet, with the results of the Remaining and Final Story Points formulas in place of the formulas, then the
+    # sprints the story was created and resolved in, None for a date that isn't in any sprint
+    for story_row in sorted(cur_assignees_rec.story_rows, key=story_store.carry_over.__getitem__, reverse=True):
+        carry_over_story = 'Y' if story_store.carry_over[story_row] else 'N'
+        remaining_points, final_points = calc_story_point_formulas(story_store.story_points[story_row],
+                                                                   carry_over_story)
+        yield (story_store.key[story_row], story_store.issue_type[story_row], story_store.summary[story_row],
+               story_store.assignee[story_row], story_store.status[story_row], story_store.priority[story_row],
+               story_store.story_points[story_row], carry_over_story, remaining_points, final_points,
+               story_store.sprints_carried[story_row], story_store.created_sprint[story_row] or None,
+               story_store.resolved_sprint[story_row] or None)
+
+
+# ********************************************************************************************************************
+def calc_assignee_point_totals(ipm_planning_ss: IpmPlanningSS) -> None:
+    # the values of the sum() formulas in each assignee's totals row, like sum() the "" of a new story is skipped
+    story_store = ipm_planning_ss.story_store
+    for cur_assignees_rec in ipm_planning_ss.assignees:
+        cur_assignees_rec.initial_points_total = 0
+        cur_assignees_rec.final_points_total = 0
+        for story_row in cur_assignees_rec.story_rows:
+            carry_over_story = 'Y' if story_store.carry_over[story_row] else 'N'
+            final_points = calc_story_point_formulas(story_store.story_points[story_row], carry_over_story)[1]
+            cur_assignees_rec.initial_points_total += story_store.story_points[story_row]
+            cur_assignees_rec.final_points_total += final_points
+
+    return None
+
+
+# ********************************************************************************************************************
+def read_xlsx_cells(xlsx_path: str, sheet_cells: dict[str, list[str]]) -> dict[tuple[str, str], tuple]:
+    # read cells back from a written workbook, straight from the worksheet XML in the .xlsx zip. sheet_cells maps the
+    # zip path of each worksheet to the cells wanted, e.g. 'G5', the result maps (sheet path, cell) to the cell's
+    # (formula, value) with the cached value of a formula, a cell that isn't in the worksheet isn't in the result
+    from xml.etree import ElementTree
+
+    xml_ns = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+    cell_values = {}
+    with zipfile.ZipFile(xlsx_path) as xlsx_zip:
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in xlsx_zip.namelist():
+            for string_item in ElementTree.fromstring(xlsx_zip.read('xl/sharedStrings.xml')).iter(xml_ns + 'si'):
+                shared_strings.append(''.join(text.text or '' for text in string_item.iter(xml_ns + 't')))
+        for sheet_path, cell_refs in sheet_cells.items():
+            cell_refs = set(cell_refs)
+            for cell in ElementTree.fromstring(xlsx_zip.read(sheet_path)).iter(xml_ns + 'c'):
+                if cell.get('r') not in cell_refs:
+                    continue
+                formula = cell.findtext(xml_ns + 'f')
+                if cell.get('t') == 's':
+                    value = shared_strings[int(cell.findtext(xml_ns + 'v'))]
+                elif cell.get('t') == 'inlineStr':
+                    value = ''.join(text.text or '' for text in cell.iter(xml_ns + 't'))
+                else:
+                    value = cell.findtext(xml_ns + 'v')
+                cell_values[(sheet_path, cell.get('r'))] = (formula, value)
+
+    return cell_values
+
+
+# ********************************************************************************************************************
+def verify_workbook_point_totals(ipm_planning_ss: IpmPlanningSS, expected_totals: dict[str, float]) -> list[str]:
+    # reopen the written workbook and check the All Assignees rows reference each assignee's totals row, and that
+    # the cached totals in both worksheets are the totals of the story data
+    def get_sheet_path(worksheet) -> str:
+        return 'xl/worksheets/sheet' + str(worksheet.index + 1) + '.xml'
+
+    totals_path = get_sheet_path(ipm_planning_ss.assignee_total_ws)
+    sheet_cells = {totals_path: []}
+    for ws_row, cur_assignees_rec in enumerate(ipm_planning_ss.assignees, start=2):
+        total_row = str(len(cur_assignees_rec.story_rows) + 4)
+        sheet_cells[totals_path].extend(('A' + str(ws_row), 'B' + str(ws_row), 'C' + str(ws_row)))
+        sheet_cells[get_sheet_path(cur_assignees_rec.ws)] = ['G' + total_row, 'J' + total_row]
+    cell_values = read_xlsx_cells(ipm_planning_ss.output_path, sheet_cells)
+
+    workbook_mismatches = []
+
+    def check_cell(sheet_path: str, cell_ref: str, expected_formula: str | None, expected_points: float) -> None:
+        formula, value = cell_values.get((sheet_path, cell_ref), (None, None))
+        cell_name = sheet_path + ' ' + cell_ref
+        if expected_formula is not None and formula != expected_formula:
+            workbook_mismatches.append(cell_name + ' formula ' + str(formula) + ' != ' + expected_formula)
+        try:
+            cell_points = float(value)
+        except (TypeError, ValueError):
+            workbook_mismatches.append(cell_name + ' has no cached total, found ' + repr(value))
+            return
+        if not math.isclose(cell_points, expected_points, abs_tol=1e-9):
+            workbook_mismatches.append(cell_name + ' ' + str(cell_points) + ' != ' + str(expected_points) +
+                                       ' from the story data')
+
+    workbook_assignees = []
+    for ws_row, cur_assignees_rec in enumerate(ipm_planning_ss.assignees, start=2):
+        assignee = cur_assignees_rec.assignee
+        workbook_assignees.append(cell_values.get((totals_path, 'A' + str(ws_row)), (None, None))[1])
+        expected_points = expected_totals.get(assignee, 0)
+        total_row = str(len(cur_assignees_rec.story_rows) + 4)
+        sheet_path = get_sheet_path(cur_assignees_rec.ws)
+        # the same references write_ipm_planning_assignee_totals_to_spreadsheet() writes, without the '='
+        check_cell(totals_path, 'B' + str(ws_row), "'" + assignee + "'!G" + total_row, expected_points)
+        check_cell(totals_path, 'C' + str(ws_row), "'" + assignee + "'!J" + total_row, expected_points)
+        check_cell(sheet_path, 'G' + total_row, None, expected_points)
+        check_cell(sheet_path, 'J' + total_row, None, expected_points)
+    if sorted(workbook_assignees, key=str) != sorted(expected_totals, key=str):
+        workbook_mismatches.append('assignees in ' + totals_path + ' ' + str(workbook_assignees) +
+                                   ' != assignees in story data ' + str(list(expected_totals)))
+
+    return workbook_mismatches
+
+
+# ********************************************************************************************************************
+def verify_assignee_point_totals(ipm_planning_ss: IpmPlanningSS, story_rows, check_workbook: bool) -> bool:
+    # cross check the totals written to the report against the story data, summed straight from the stories without
+    # the assignee grouping. With check_workbook the written workbook is read back and checked as well
+    story_store = ipm_planning_ss.story_store
+    expected_totals = {}
+    for story_row in story_rows:
+        assignee = story_store.assignee[story_row]
+        expected_totals[assignee] = expected_totals.get(assignee, 0) + story_store.story_points[story_row]
+
+    mismatches = []
+    written_assignees = [cur_assignees_rec.assignee for cur_assignees_rec in ipm_planning_ss.assignees]
+    if sorted(written_assignees, key=str) != sorted(expected_totals, key=str):
+        mismatches.append('assignees in workbook ' + str(written_assignees) + ' != assignees in story data ' +
+                          str(list(expected_totals)))
+    for cur_assignees_rec in ipm_planning_ss.assignees:
+        expected_points = expected_totals.get(cur_assignees_rec.assignee, 0)
+        for total_name, total_points in (('Initial Story Points', cur_assignees_rec.initial_points_total),
+                                         ('Final Story Points', cur_assignees_rec.final_points_total),
+                                         ('running total', cur_assignees_rec.total_points)):
+            if not math.isclose(total_points, expected_points, abs_tol=1e-9):
+                mismatches.append(str(cur_assignees_rec.assignee) + ' ' + total_name + ' ' + str(total_points) +
+                                  ' != ' + str(expected_points) + ' from the story data')
+    if check_workbook:
+        mismatches.extend(verify_workbook_point_totals(ipm_planning_ss, expected_totals))
+
+    for mismatch in mismatches:
+        print('****** Verify mismatch: ' + mismatch)
+    if not mismatches:
+        print('   Verified the totals of ' + str(len(written_assignees)) + ' assignees against the story data' +
+              (' and ' + ipm_planning_ss.output_path if check_workbook else ''))
+
+    return not mismatches
+
+
 # ********************************************************************************************************************
 def write_ipm_planning_data_to_spreadsheet(ipm_planning_ss: IpmPlanningSS) -> None:
 
+    # each assignee worksheet is created, filled and totaled before moving on to the next one so that every row is
+    # written in order, which is what the streaming (constant_memory) mode requires
+    story_store = ipm_planning_ss.story_store
     for cur_assignees_rec in ipm_planning_ss.assignees:
-        cur_assignees_rec.stories.sort(key=lambda jira_story_rec: jira_story_rec.carry_over_story, reverse=True)
-        bottom_row = len(cur_assignees_rec.stories)
-        ws_row = 1  # leave a empty row above the first row of data for easier manual insertion during IPM
-        for cur_story in cur_assignees_rec.stories:
-            ws_row += 1
-            print(cur_story.key, cur_story.assignee)
-            cur_assignees_rec.ws.write(ws_row, 0, cur_story.key, ipm_planning_ss.left_fmt)
-            cur_assignees_rec.ws.write(ws_row, 1, cur_story.issue_type, ipm_planning_ss.left_fmt)
-            cur_assignees_rec.ws.write(ws_row, 2, cur_story.summary, ipm_planning_ss.left_fmt)
-            cur_assignees_rec.ws.write(ws_row, 3, cur_story.assignee, ipm_planning_ss.left_fmt)
-            cur_assignees_rec.ws.write(ws_row, 4, cur_story.status, ipm_planning_ss.center_fmt)
-            cur_assignees_rec.ws.write(ws_row, 5, cur_story.priority, ipm_planning_ss.center_fmt)
-            cell_fmt = ipm_planning_ss.center_fmt
-            cur_assignees_rec.ws.write(ws_row, 6, cur_story.story_points, cell_fmt)
-            cur_assignees_rec.ws.write(ws_row, 7, cur_story.carry_over_story, cell_fmt)
-            # formula to calculate remaining story points, if col H = 'Y' then it's a carryover story so return the
-            # initial story points found in col G, if not then it is a new story so return an empty string
-            remaining_points_fml = '=IF(H' + str(ws_row + 1) + '="Y", G' + str(ws_row + 1) + ', "")'
-            cur_assignees_rec.ws.write(ws_row, 8, remaining_points_fml, cell_fmt)
-            # formula to calculate fina story points, if col I is an empty string "" then it's a new story return the
-            # initial story points, else it's a carryover story so return the remaining story points in col I
-            final_points_fml = '=IF(I' + str(ws_row + 1) + '="", G' + str(ws_row + 1) + ', I' + str(ws_row + 1) + ')'
-            cur_assignees_rec.ws.write(ws_row, 9, final_points_fml, cell_fmt)
-
-        # leave an empty row between last story and totals row for easier insertion during IPM
+        with profile_stage('write sheet ' + str(cur_assignees_rec.assignee)):
+            write_assignee_worksheet(ipm_planning_ss, story_store, cur_assignees_rec)
+
+    return None
+
+
+# ********************************************************************************************************************
+def write_assignee_worksheet(ipm_planning_ss: IpmPlanningSS, story_store: StoryStore,
+                             cur_assignees_rec: AssigneesRec) -> None:
+    write_assignee_worksheet_header(ipm_planning_ss, cur_assignees_rec)
+    # carry over stories first, sorted() is stable so the export order is kept within each group
+    cur_assignees_rec.story_rows = array('l', sorted(cur_assignees_rec.story_rows,
+                                                     key=story_store.carry_over.__getitem__, reverse=True))
+    bottom_row = len(cur_assignees_rec.story_rows)
+    ws_row = 1  # leave a empty row above the first row of data for easier manual insertion during IPM
+    for story_row in cur_assignees_rec.story_rows:
         ws_row += 1
-        test = (' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ')
-        cur_assignees_rec.ws.write_row(ws_row, 0, test, ipm_planning_ss.last_row_fmt)
+        log.debug('%s %s', story_store.key[story_row], story_store.assignee[story_row])
+        cur_assignees_rec.ws.write(ws_row, 0, story_store.key[story_row], ipm_planning_ss.left_fmt)
+        cur_assignees_rec.ws.write(ws_row, 1, story_store.issue_type[story_row], ipm_planning_ss.left_fmt)
+        cur_assignees_rec.ws.write(ws_row, 2, story_store.summary[story_row], ipm_planning_ss.left_fmt)
+        cur_assignees_rec.ws.write(ws_row, 3, story_store.assignee[story_row], ipm_planning_ss.left_fmt)
+        cur_assignees_rec.ws.write(ws_row, 4, story_store.status[story_row], ipm_planning_ss.center_fmt)
+        cur_assignees_rec.ws.write(ws_row, 5, story_store.priority[story_row], ipm_planning_ss.center_fmt)
+        cell_fmt = ipm_planning_ss.center_fmt
+        cur_assignees_rec.ws.write(ws_row, 6, story_store.story_points[story_row], cell_fmt)
+        carry_over_story = 'Y' if story_store.carry_over[story_row] else 'N'
+        cur_assignees_rec.ws.write(ws_row, 7, carry_over_story, cell_fmt)
+        # the formulas are written along with their results so the values can be read without recalculating
+        remaining_points, final_points = calc_story_point_formulas(story_store.story_points[story_row],
+                                                                   carry_over_story)
+        # formula to calculate remaining story points, if col H = 'Y' then it's a carryover story so return the
+        # initial story points found in col G, if not then it is a new story so return an empty string
+        remaining_points_fml = '=IF(H' + str(ws_row + 1) + '="Y", G' + str(ws_row + 1) + ', "")'
+        cur_assignees_rec.ws.write_formula(ws_row, 8, remaining_points_fml, cell_fmt, remaining_points)
+        # formula to calculate fina story points, if col I is an empty string "" then it's a new story return the
+        # initial story points, else it's a carryover story so return the remaining story points in col I
+        final_points_fml = '=IF(I' + str(ws_row + 1) + '="", G' + str(ws_row + 1) + ', I' + str(ws_row + 1) + ')'
+        cur_assignees_rec.ws.write_formula(ws_row, 9, final_points_fml, cell_fmt, final_points)
+        cur_assignees_rec.ws.write(ws_row, 10, story_store.sprints_carried[story_row], cell_fmt)
+
+    # leave an empty row between last story and totals row for easier insertion during IPM
+    ws_row += 1
+    test = (' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ')
+    cur_assignees_rec.ws.write_row(ws_row, 0, test, ipm_planning_ss.last_row_fmt)
+
+    cur_assignees_rec.ws.write_formula(ws_row + 1, 6, '=sum(G2:G' + str(ws_row + 1) + ')',
+                                       ipm_planning_ss.totals_fmt, cur_assignees_rec.initial_points_total)
+    cur_assignees_rec.ws.write_formula(ws_row + 1, 9, '=sum(J2:J' + str(ws_row + 1) + ')',
+                                       ipm_planning_ss.totals_fmt, cur_assignees_rec.final_points_total)
+
+    return None
+
+
+# ********************************************************************************************************************
+def init_render_worker(story_store: StoryStore, debug: bool) -> None:
+    # runs once in each render worker process, the story data is sent to the worker once instead of once per sheet
+    render_worker_state['story_store'] = story_store
+    configure_logging(debug)
+
+    return None
+
+
+# ********************************************************************************************************************
+def render_assignee_worksheet(render_job: tuple) -> tuple[int, int, int, bytes]:
+    # write one assignee worksheet into a throwaway workbook and return the worksheet XML compressed, ready to be
+    # copied into the workbook zip as it is, see assemble_rendered_worksheets(), the workbook is never closed
+    # constant_memory mode writes the strings inline instead of into the workbook's shared strings table, so the XML
+    # doesn't depend on anything but the format numbering fixed by fix_ss_format_xf_indices()
+    assignee, story_rows, initial_points_total, final_points_total = render_job
+    ipm_planning_ss = create_ss_workbook_and_formats(assignee, streaming=True, fix_xf_indices=True)
+    cur_assignees_rec = AssigneesRec(assignee, story_rows[0], 0)
+    cur_assignees_rec.story_rows = story_rows
+    cur_assignees_rec.initial_points_total = initial_points_total
+    cur_assignees_rec.final_points_total = final_points_total
+    write_assignee_worksheet(ipm_planning_ss, render_worker_state['story_store'], cur_assignees_rec)
+
+    # the same steps xlsxwriter's packager runs on each worksheet, writing to a string instead of the zip file
+    worksheet = cur_assignees_rec.ws
+    worksheet._opt_reopen()
+    worksheet._write_single_row()
+    worksheet_xml = io.StringIO()
+    worksheet._set_filehandle(worksheet_xml)
+    worksheet._assemble_xml_file()
+
+    # compressed here in the worker rather than by the process assembling the workbook
+    xml_bytes = worksheet_xml.getvalue().encode('utf-8')
+    compressor = zlib.compressobj(WORKSHEET_DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    return zipfile.ZIP_DEFLATED, zlib.crc32(xml_bytes), len(xml_bytes), compressor.compress(xml_bytes) + \
+        compressor.flush()
+
+
+# ********************************************************************************************************************
+def read_raw_zip_member(zip_file, zip_info: zipfile.ZipInfo) -> bytes:
+    # the data of a zip member as it is stored in the zip file zip_file is open on, still compressed
+    zip_file.seek(zip_info.header_offset)
+    local_header = ZIP_LOCAL_HEADER.unpack(zip_file.read(ZIP_LOCAL_HEADER.size))
+    zip_file.seek(local_header[9] + local_header[10], os.SEEK_CUR)  # past the file name and extra field
+
+    return zip_file.read(zip_info.compress_size)
+
+
+# ********************************************************************************************************************
+def write_raw_zip(zip_path: str, zip_members: list[tuple[zipfile.ZipInfo, bytes]]) -> None:
+    # write a zip file of (ZipInfo, data as stored) members, the data is written as it is, so members that are already
+    # compressed aren't compressed again, the ZipInfo gives the name, date, compress type, CRC and uncompressed size
+    central_records = []
+    with open(zip_path, 'wb') as zip_file:
+        for zip_info, raw_data in zip_members:
+            header_offset = zip_file.tell()
+            file_name = zip_info.filename.encode('utf-8')
+            name_flags = 0 if zip_info.filename.isascii() else 0x800  # bit 11 marks a UTF-8 file name
+            year, month, day, hour, minute, second = zip_info.date_time
+            dos_time = hour << 11 | minute << 5 | second // 2
+            dos_date = (year - 1980) << 9 | month << 5 | day
+            if max(header_offset, zip_info.file_size, len(raw_data)) > 0xFFFFFFFF:
+                raise ValueError(zip_path + ' needs zip64, which write_raw_zip() does not write')
+            zip_file.write(ZIP_LOCAL_HEADER.pack(b'PK\x03\x04', 20, name_flags, zip_info.compress_type, dos_time,
+                                                 dos_date, zip_info.CRC, len(raw_data), zip_info.file_size,
+                                                 len(file_name), 0))
+            zip_file.write(file_name)
+            zip_file.write(raw_data)
+            central_records.append(ZIP_CENTRAL_HEADER.pack(b'PK\x01\x02', zip_info.create_system << 8 | 20, 20,
+                                                           name_flags, zip_info.compress_type, dos_time, dos_date,
+                                                           zip_info.CRC, len(raw_data), zip_info.file_size,
+                                                           len(file_name), 0, 0, 0, 0, zip_info.external_attr,
+                                                           header_offset) + file_name)
+        central_offset = zip_file.tell()
+        if central_offset > 0xFFFFFFFF or len(central_records) > 0xFFFF:
+            raise ValueError(zip_path + ' needs zip64, which write_raw_zip() does not write')
+        for central_record in central_records:
+            zip_file.write(central_record)
+        zip_file.write(ZIP_END_RECORD.pack(b'PK\x05\x06', 0, 0, len(central_records), len(central_records),
+                                           zip_file.tell() - central_offset, central_offset, 0))
+
+    return None
+
+
+# ********************************************************************************************************************
+def assemble_rendered_worksheets(workbook_path: str, sheet_paths: list[str], stored_sheets: list[tuple]) -> None:
+    # rebuild the closed workbook with the placeholder worksheets at sheet_paths swapped for stored_sheets, in the same
+    # order, each a (compress type, CRC, size, data as stored in a zip) tuple, then move it over the workbook. Every
+    # member is copied as it is stored, nothing is decompressed or compressed again here
+    if len(stored_sheets) != len(sheet_paths):
+        raise ValueError(str(len(stored_sheets)) + ' worksheets for ' + str(len(sheet_paths)) + ' placeholders in ' +
+                         workbook_path)
+    new_workbook_path = workbook_path + '.assembling'
+    sheet_slots = dict(zip(sheet_paths, stored_sheets))
+    zip_members = []
+    with zipfile.ZipFile(workbook_path) as old_zip, open(workbook_path, 'rb') as old_file:
+        for zip_info in old_zip.infolist():
+            stored_sheet = sheet_slots.pop(zip_info.filename, None)
+            if stored_sheet is None:
+                zip_members.append((zip_info, read_raw_zip_member(old_file, zip_info)))
+            else:
+                sheet_info = zipfile.ZipInfo(zip_info.filename, zip_info.date_time)
+                sheet_info.create_system = zip_info.create_system
+                sheet_info.external_attr = zip_info.external_attr
+                sheet_info.compress_type, sheet_info.CRC, sheet_info.file_size, sheet_data = stored_sheet
+                zip_members.append((sheet_info, sheet_data))
+    if sheet_slots:
+        raise ValueError('only ' + str(len(sheet_paths) - len(sheet_slots)) + ' of ' + str(len(sheet_paths)) +
+                         ' rendered worksheets were placed in ' + workbook_path)
+    try:
+        write_raw_zip(new_workbook_path, zip_members)
+    except BaseException:
+        if os.path.exists(new_workbook_path):
+            os.remove(new_workbook_path)
+        raise
+    os.replace(new_workbook_path, workbook_path)
+
+    return None
+
+
+# ********************************************************************************************************************
+def iter_assignee_stored_sheets(assignees: list[AssigneesRec], reused_sheets: dict[str, str], previous_zip,
+                                previous_file, rendered_sheets):
+    # every assignee worksheet in assignee order as assemble_rendered_worksheets() takes them, copied as stored from
+    # the previous workbook, which previous_file is also open on, when the sheet is reused
+    for cur_assignees_rec in assignees:
+        if str(cur_assignees_rec.assignee) in reused_sheets:
+            zip_info = previous_zip.getinfo(reused_sheets[str(cur_assignees_rec.assignee)])
+            yield (zip_info.compress_type, zip_info.CRC, zip_info.file_size,
+                   read_raw_zip_member(previous_file, zip_info))
+        else:
+            yield next(rendered_sheets)
+
+
+# ********************************************************************************************************************
+def render_ipm_planning_data(ipm_planning_ss: IpmPlanningSS, render_jobs: int,
+                             reused_sheets: dict[str, str] | None = None) -> None:
+    # the assignee worksheets are rendered while this process finishes the rest of the workbook with a header only
+    # placeholder for each of them, then the placeholders are swapped for the rendered worksheets in assignee order,
+    # the All Assignees references only depend on the sheet names and row counts
+    # with more than one render job the worksheets are rendered by a pool of worker processes, and the worksheets in
+    # reused_sheets (assignee -> worksheet path in the previous workbook) are copied from the previous workbook, which
+    # is still in the output file until finish_report_workbook() replaces it
+    if reused_sheets is None:
+        reused_sheets = {}
+    render_jobs_list = [(cur_assignees_rec.assignee, cur_assignees_rec.story_rows,
+                         cur_assignees_rec.initial_points_total, cur_assignees_rec.final_points_total)
+                        for cur_assignees_rec in ipm_planning_ss.assignees
+                        if str(cur_assignees_rec.assignee) not in reused_sheets]
+    render_jobs = max(1, min(render_jobs, len(render_jobs_list)))
+
+    executor = None
+    if render_jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=render_jobs, initializer=init_render_worker,
+                                       initargs=(ipm_planning_ss.story_store, log.isEnabledFor(logging.DEBUG)))
+        rendered_sheets = executor.map(render_assignee_worksheet, render_jobs_list,
+                                       chunksize=max(1, len(render_jobs_list) // (render_jobs * 4)))
+    else:
+        init_render_worker(ipm_planning_ss.story_store, log.isEnabledFor(logging.DEBUG))
+        rendered_sheets = map(render_assignee_worksheet, render_jobs_list)
+    try:
+        with profile_stage('write placeholder sheets'):
+            for cur_assignees_rec in ipm_planning_ss.assignees:
+                write_assignee_worksheet_header(ipm_planning_ss, cur_assignees_rec)
+
+        with profile_stage('workbook close'):
+            ipm_planning_ss.workbook.close()
+        # the rendering overlaps the placeholder sheets and the workbook close, waiting for the rest of it is timed
+        # apart from the assembly so the time this process spends on its own can be seen in the run profile
+        with profile_stage('render assignee sheets (' + str(render_jobs) + ' processes)'):
+            if reused_sheets:
+                with zipfile.ZipFile(ipm_planning_ss.output_path) as previous_zip, \
+                        open(ipm_planning_ss.output_path, 'rb') as previous_file:
+                    stored_sheets = list(iter_assignee_stored_sheets(ipm_planning_ss.assignees, reused_sheets,
+                                                                     previous_zip, previous_file, rendered_sheets))
+            else:
+                stored_sheets = list(rendered_sheets)
+        with profile_stage('assemble workbook'):
+            sheet_paths = ['xl/worksheets/sheet' + str(cur_assignees_rec.ws.index + 1) + '.xml'
+                           for cur_assignees_rec in ipm_planning_ss.assignees]
+            assemble_rendered_worksheets(ipm_planning_ss.workbook.filename, sheet_paths, stored_sheets)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    return None
 
-        cur_assignees_rec.ws.write(ws_row + 1, 6, '=sum(G2:G' + str(ws_row + 1) + ')', ipm_planning_ss.totals_fmt)
-        cur_assignees_rec.ws.write(ws_row + 1, 9, '=sum(J2:J' + str(ws_row + 1) + ')', ipm_planning_ss.totals_fmt)
+
+# ********************************************************************************************************************
+def get_report_manifest_path(workbook_path: str) -> Path:
+    # e.g. 'Output files/FASTR1i45 IPM Planning.manifest.json' next to 'Output files/FASTR1i45 IPM Planning.xlsx'
+    return Path(workbook_path).with_suffix('.manifest.json')
+
+
+# ********************************************************************************************************************
+def calc_assignee_digests(ipm_planning_ss: IpmPlanningSS) -> dict[str, str]:
+    # a digest of everything written to each assignee worksheet, two runs with the same digest render the same sheet
+    story_store = ipm_planning_ss.story_store
+    assignee_digests = {}
+    for cur_assignees_rec in ipm_planning_ss.assignees:
+        assignee_digest = hashlib.sha256()
+        for story_row in cur_assignees_rec.story_rows:
+            assignee_digest.update(repr((story_store.key[story_row], story_store.issue_type[story_row],
+                                         story_store.summary[story_row], story_store.assignee[story_row],
+                                         story_store.status[story_row], story_store.priority[story_row],
+                                         story_store.story_points[story_row], story_store.carry_over[story_row],
+                                         story_store.sprints_carried[story_row])).encode('utf-8'))
+        assignee_digests[str(cur_assignees_rec.assignee)] = assignee_digest.hexdigest()
+
+    return assignee_digests
+
+
+# ********************************************************************************************************************
+def load_report_manifest(workbook_path: str) -> dict | None:
+    # the manifest written with the previous workbook, or None if there isn't one that matches the workbook on disk
+    manifest_path = get_report_manifest_path(workbook_path)
+    try:
+        with open(manifest_path) as manifest_file:
+            report_manifest = json.load(manifest_file)
+        workbook_stat = os.stat(workbook_path)
+    except (OSError, ValueError):
+        print('   No manifest from a previous run, rendering every assignee sheet')
+        return None
+
+    if report_manifest.get('version') != REPORT_MANIFEST_VERSION or \
+            report_manifest.get('workbook_size') != workbook_stat.st_size or \
+            report_manifest.get('workbook_mtime_ns') != workbook_stat.st_mtime_ns:
+        # an older manifest, or the workbook was saved by something else since it was written
+        print('   ' + str(manifest_path) + ' does not match ' + workbook_path + ', rendering every assignee sheet')
+        return None
+
+    return report_manifest
+
+
+# ********************************************************************************************************************
+def find_reusable_sheets(report_manifest: dict, assignee_digests: dict[str, str]) -> dict[str, str]:
+    # assignee -> worksheet path in the previous workbook, for every assignee whose stories haven't changed
+    reused_sheets = {}
+    for assignee, assignee_digest in assignee_digests.items():
+        previous_sheet = report_manifest['assignees'].get(assignee)
+        if previous_sheet and previous_sheet['digest'] == assignee_digest:
+            reused_sheets[assignee] = previous_sheet['sheet_path']
+    print('   Reusing ' + str(len(reused_sheets)) + ' of ' + str(len(assignee_digests)) +
+          ' assignee sheets from the previous report')
+
+    return reused_sheets
+
+
+# ********************************************************************************************************************
+def write_report_manifest(ipm_planning_ss: IpmPlanningSS, assignee_digests: dict[str, str]) -> None:
+    # records what each assignee sheet was rendered from and where it is in the workbook, along with every story's
+    # assignee and points for the change summary of the next run
+    story_store = ipm_planning_ss.story_store
+    workbook_stat = os.stat(ipm_planning_ss.output_path)
+    report_manifest = {'version': REPORT_MANIFEST_VERSION,
+                       'created': datetime.now().isoformat(timespec='seconds'),
+                       'workbook_size': workbook_stat.st_size,
+                       'workbook_mtime_ns': workbook_stat.st_mtime_ns,
+                       'assignees': {},
+                       'stories': {}}
+    for cur_assignees_rec in ipm_planning_ss.assignees:
+        report_manifest['assignees'][str(cur_assignees_rec.assignee)] = {
+            'digest': assignee_digests[str(cur_assignees_rec.assignee)],
+            'sheet_path': 'xl/worksheets/sheet' + str(cur_assignees_rec.ws.index + 1) + '.xml',
+            'initial_points_total': cur_assignees_rec.initial_points_total,
+            'final_points_total': cur_assignees_rec.final_points_total}
+        for story_row in cur_assignees_rec.story_rows:
+            report_manifest['stories'][story_store.key[story_row]] = [str(cur_assignees_rec.assignee),
+                                                                      story_store.story_points[story_row]]
+
+    manifest_path = get_report_manifest_path(ipm_planning_ss.output_path)
+    with open(str(manifest_path) + '.tmp', 'w') as manifest_file:
+        json.dump(report_manifest, manifest_file)
+    os.replace(str(manifest_path) + '.tmp', manifest_path)
+
+    return None
+
+
+# ********************************************************************************************************************
+def print_report_changes(report_manifest: dict, ipm_planning_ss: IpmPlanningSS) -> None:
+    # summary of what changed in the story data since the previous report was written
+    story_store = ipm_planning_ss.story_store
+    previous_stories = report_manifest['stories']
+    current_stories = {}
+    for cur_assignees_rec in ipm_planning_ss.assignees:
+        for story_row in cur_assignees_rec.story_rows:
+            current_stories[story_store.key[story_row]] = [str(cur_assignees_rec.assignee),
+                                                           story_store.story_points[story_row]]
+
+    added_lines = []
+    moved_lines = []
+    points_lines = []
+    for key, (assignee, story_points) in current_stories.items():
+        if key not in previous_stories:
+            added_lines.append('{} added to {}, {:g} points'.format(key, assignee, story_points))
+            continue
+        previous_assignee, previous_points = previous_stories[key]
+        if previous_assignee != assignee:
+            moved_lines.append(key + ' moved from ' + previous_assignee + ' to ' + assignee)
+        if previous_points != story_points:
+            points_lines.append('{} points {:g} -> {:g}'.format(key, previous_points, story_points))
+    removed_lines = ['{} removed from {}, {:g} points'.format(key, previous_stories[key][0], previous_stories[key][1])
+                     for key in previous_stories if key not in current_stories]
+
+    print('   Changes since the previous report: {} added, {} removed, {} moved, {} re-pointed'.format(
+        len(added_lines), len(removed_lines), len(moved_lines), len(points_lines)))
+    for change_lines in (added_lines, removed_lines, moved_lines, points_lines):
+        for change_line in change_lines[:CHANGE_SUMMARY_LIMIT]:
+            print('      ' + change_line)
+        if len(change_lines) > CHANGE_SUMMARY_LIMIT:
+            print('      ... and ' + str(len(change_lines) - CHANGE_SUMMARY_LIMIT) + ' more')
+
+    # point deltas of every assignee whose totals changed, including assignees with no stories left
+    current_totals = {str(cur_assignees_rec.assignee): (cur_assignees_rec.initial_points_total,
+                                                        cur_assignees_rec.final_points_total)
+                      for cur_assignees_rec in ipm_planning_ss.assignees}
+    for assignee in list(current_totals) + [assignee for assignee in report_manifest['assignees']
+                                            if assignee not in current_totals]:
+        previous_sheet = report_manifest['assignees'].get(assignee, {})
+        initial_delta = current_totals.get(assignee, (0, 0))[0] - previous_sheet.get('initial_points_total', 0)
+        final_delta = current_totals.get(assignee, (0, 0))[1] - previous_sheet.get('final_points_total', 0)
+        if initial_delta or final_delta:
+            print('      {}: initial points {:+g}, final points {:+g}'.format(assignee, initial_delta, final_delta))
+
+    return None
+
+
+# ********************************************************************************************************************
+def get_sprint_names(sprint_date_index: SprintDateIndex) -> dict[int, str]:
+    # sprint number -> sprint name for every sprint in the sprint dates workbook, in sprint number order
+    return {sprint_number: sprint_date_index.sprint_infos[sprint_row].name
+            for sprint_number, sprint_row in zip(sprint_date_index.sorted_numbers, sprint_date_index.number_rows)}
+
+
+# ********************************************************************************************************************
+def calc_velocity_table(story_store: StoryStore, sprint_history: SprintHistoryIndex, sprint_names: dict[int, str],
+                        sprint_to_plan: int, story_rows: list[int] | None = None) -> VelocityTable:
+    # NumPy is only needed for the Velocity worksheet, so it is only imported when one is asked for
+    import numpy as np
+
+    # the assignees are coded in the order they first appear, by dict and map calls that run in C rather than a
+    # Python loop per story. Given story_rows only those stories, and so only their assignees, are in the table
+    if story_rows is None:
+        listed_rows = np.arange(len(story_store))
+        listed_assignees = story_store.assignee
+    else:
+        listed_rows = np.fromiter(story_rows, dtype=np.int64, count=len(story_rows))
+        listed_assignees = np.array(story_store.assignee, dtype=object)[listed_rows]
+    distinct_assignees = dict.fromkeys(listed_assignees)
+    assignee_codes = dict(zip(distinct_assignees, range(len(distinct_assignees))))
+    assignee_col = np.zeros(len(story_store), dtype=np.int64)
+    assignee_col[listed_rows] = np.fromiter(map(assignee_codes.__getitem__, listed_assignees), dtype=np.int64,
+                                            count=len(listed_rows))
+    points_col = np.nan_to_num(np.frombuffer(story_store.story_points, dtype=np.float64))
+
+    # every (story, sprint) membership as a key unique to the story and sprint, from the sprint history's sprint ->
+    # stories lists. Sorted, a story's sprints are next to each other in sprint order, so a story being in the sprint
+    # before is a compare with the key before it
+    history_numbers = sorted(sprint_history.sprint_stories)
+    key_stride = max(history_numbers, default=0) + 2
+    num_pairs = sum(len(sprint_stories) for sprint_stories in sprint_history.sprint_stories.values())
+    pair_keys = np.fromiter(itertools.chain.from_iterable(sprint_history.sprint_stories[sprint_number]
+                                                          for sprint_number in history_numbers),
+                            dtype=np.int64, count=num_pairs) * key_stride
+    pair_keys += np.repeat(np.asarray(history_numbers, dtype=np.int64),
+                           [len(sprint_history.sprint_stories[sprint_number]) for sprint_number in history_numbers])
+    pair_keys.sort()
+    pair_rows, pair_sprints = np.divmod(pair_keys, key_stride)
+    carried_in = np.zeros(num_pairs, dtype=bool)
+    carried_in[1:] = pair_keys[:-1] == pair_keys[1:] - 1
+    # a story is completed in the sprint it was resolved in, so a sprint still in progress or in the future only
+    # counts the stories that are done so far
+    completed = np.frombuffer(story_store.resolved_sprint, dtype=np.uint16)[pair_rows] == pair_sprints
+
+    # the columns of the table are the sprints in the sprint dates workbook up to the sprint being planned, each
+    # total is a single bincount over assignee * number of sprints + sprint column
+    sprint_numbers = [sprint_number for sprint_number in sorted(sprint_names) if sprint_number <= sprint_to_plan]
+    table_numbers = np.asarray(sprint_numbers, dtype=np.int64)
+    pair_cols = np.minimum(np.searchsorted(table_numbers, pair_sprints), max(len(sprint_numbers) - 1, 0))
+    if sprint_numbers:
+        in_table = table_numbers[pair_cols] == pair_sprints
+    else:
+        in_table = np.zeros(len(pair_sprints), dtype=bool)
+    num_assignees = len(assignee_codes)
+    table_shape = (num_assignees, len(sprint_numbers))
+    pair_bins = (assignee_col[pair_rows] * len(sprint_numbers) + pair_cols)[in_table]
+    pair_points = points_col[pair_rows][in_table]
+
+    def sum_points(pair_mask):
+        # bincount counts rather than sums when there are no pairs at all, so the sums are always made floats
+        return np.bincount(pair_bins[pair_mask], pair_points[pair_mask],
+                           num_assignees * len(sprint_numbers)).astype(np.float64).reshape(table_shape)
+
+    velocity_table = VelocityTable(list(assignee_codes), sprint_numbers,
+                                   [sprint_names[sprint_number] for sprint_number in sprint_numbers])
+    velocity_table.committed_points = sum_points(np.ones(len(pair_bins), dtype=bool))
+    velocity_table.carry_over_points = sum_points(carried_in[in_table])
+    velocity_table.completed_points = sum_points(completed[in_table])
+
+    velocity_table.carry_over_rate = np.divide(velocity_table.carry_over_points, velocity_table.committed_points,
+                                               out=np.zeros_like(velocity_table.committed_points),
+                                               where=velocity_table.committed_points > 0)
+
+    # the rolling velocity is the average completed points over the last VELOCITY_WINDOW sprints
+    completed_cumsum = np.cumsum(np.pad(velocity_table.completed_points, ((0, 0), (1, 0))), axis=1)
+    window_start = np.maximum(np.arange(1, len(sprint_numbers) + 1) - VELOCITY_WINDOW, 0)
+    window_len = np.arange(1, len(sprint_numbers) + 1) - window_start
+    velocity_table.rolling_velocity = (completed_cumsum[:, 1:] - completed_cumsum[:, window_start]) / window_len
+
+    return velocity_table
+
+
+# ********************************************************************************************************************
+def write_velocity_to_spreadsheet(ipm_planning_ss: IpmPlanningSS, velocity_table: VelocityTable) -> None:
+
+    print('      ** Writing Velocity spreadsheet tab')
+    velocity_ws = ipm_planning_ss.workbook.add_worksheet('Velocity')
+    velocity_ws.set_column('A:A', 20)
+    velocity_ws.set_column('B:B', 14)
+    velocity_ws.set_column('C:G', 14)
+    velocity_headers = ('Assignee', 'Sprint', 'Committed Story Points', 'Carryover Story Points', 'Carryover Rate',
+                        'Completed Story Points', 'Rolling Velocity')
+    velocity_ws.write_row(0, 0, velocity_headers, ipm_planning_ss.header_fmt)
+
+    ws_row = 0
+    for assignee_row, assignee in enumerate(velocity_table.assignees):
+        for sprint_col, sprint_name in enumerate(velocity_table.sprint_names):
+            ws_row += 1
+            velocity_ws.write(ws_row, 0, assignee, ipm_planning_ss.left_fmt)
+            velocity_ws.write(ws_row, 1, sprint_name, ipm_planning_ss.center_fmt)
+            velocity_ws.write(ws_row, 2, velocity_table.committed_points[assignee_row, sprint_col],
+                              ipm_planning_ss.center_fmt)
+            velocity_ws.write(ws_row, 3, velocity_table.carry_over_points[assignee_row, sprint_col],
+                              ipm_planning_ss.center_fmt)
+            velocity_ws.write(ws_row, 4, velocity_table.carry_over_rate[assignee_row, sprint_col],
+                              ipm_planning_ss.percent_fmt)
+            velocity_ws.write(ws_row, 5, velocity_table.completed_points[assignee_row, sprint_col],
+                              ipm_planning_ss.center_fmt)
+            velocity_ws.write(ws_row, 6, round(velocity_table.rolling_velocity[assignee_row, sprint_col], 1),
+                              ipm_planning_ss.center_fmt)
 
     return None
 
@@ -303,25 +1566,194 @@ def write_ipm_planning_assignee_totals_to_spreadsheet(ipm_planning_ss: IpmPlanni
     for cur_assignees_rec in ipm_planning_ss.assignees:
         ws_row += 1
         ipm_planning_ss.assignee_total_ws.write(ws_row, 0, cur_assignees_rec.assignee, ipm_planning_ss.left_fmt)
-        total_row = len(cur_assignees_rec.stories) + 4
+        total_row = len(cur_assignees_rec.story_rows) + 4
         initial_points_total_loc = "='" + cur_assignees_rec.assignee + "'!G" + str(total_row)
         final_points_total_loc = "='" + cur_assignees_rec.assignee + "'!J" + str(total_row)
         if ws_row == bottom_row:
             cell_fmt = ipm_planning_ss.last_row_fmt
         else:
             cell_fmt = ipm_planning_ss.center_fmt
-        ipm_planning_ss.assignee_total_ws.write(ws_row, 1, initial_points_total_loc, cell_fmt)
-        ipm_planning_ss.assignee_total_ws.write(ws_row, 2, final_points_total_loc, cell_fmt)
+        ipm_planning_ss.assignee_total_ws.write_formula(ws_row, 1, initial_points_total_loc, cell_fmt,
+                                                        cur_assignees_rec.initial_points_total)
+        ipm_planning_ss.assignee_total_ws.write_formula(ws_row, 2, final_points_total_loc, cell_fmt,
+                                                        cur_assignees_rec.final_points_total)
 
     total_row = '=sum(G2:G' + str(ws_row + 1) + ')'
-    ipm_planning_ss.assignee_total_ws.write(ws_row + 1, 1, '=sum(B2:B' + str(ws_row + 1) + ')', ipm_planning_ss.totals_fmt)
-    ipm_planning_ss.assignee_total_ws.write(ws_row + 1, 2, '=sum(C2:C' + str(ws_row + 1) + ')', ipm_planning_ss.totals_fmt)
+    all_initial_points = sum(cur_assignees_rec.initial_points_total for cur_assignees_rec in ipm_planning_ss.assignees)
+    all_final_points = sum(cur_assignees_rec.final_points_total for cur_assignees_rec in ipm_planning_ss.assignees)
+    ipm_planning_ss.assignee_total_ws.write_formula(ws_row + 1, 1, '=sum(B2:B' + str(ws_row + 1) + ')',
+                                                    ipm_planning_ss.totals_fmt, all_initial_points)
+    ipm_planning_ss.assignee_total_ws.write_formula(ws_row + 1, 2, '=sum(C2:C' + str(ws_row + 1) + ')',
+                                                    ipm_planning_ss.totals_fmt, all_final_points)
 
     return None
 
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def get_sprint_num_to_plan() -> int:
+def write_xlsx_report(ipm_planning_ss: IpmPlanningSS, sprint_data: SprintData, report_options: ReportOptions) -> str:
+    sprint_to_plan = sprint_data.report_name
+    # the render path is opt in: it drives private xlsxwriter methods, so it is skipped when this xlsxwriter doesn't
+    # have them, and it holds a whole worksheet's XML in memory, so streaming output never uses the process pool. It
+    # is decided before the workbook is created, which numbers the formats for it
+    render_jobs = 1 if report_options.streaming else report_options.render_jobs
+    use_render = report_options.incremental or (render_jobs > 1 and len(ipm_planning_ss.assignees) > 1)
+    if use_render and not can_render_worksheets():
+        print('   This xlsxwriter version cannot render worksheets separately, writing every assignee sheet in turn')
+        use_render = False
+    with profile_stage('workbook and format creation'):
+        create_sprint_report_spreadsheet(ipm_planning_ss, sprint_to_plan, report_options.streaming, use_render)
+
+    # in incremental mode only the assignee sheets whose stories changed since the last run are rendered again
+    reused_sheets = {}
+    if report_options.incremental:
+        with profile_stage('diff against previous report'):
+            assignee_digests = calc_assignee_digests(ipm_planning_ss)
+            report_manifest = load_report_manifest(ipm_planning_ss.output_path)
+            if report_manifest:
+                print_report_changes(report_manifest, ipm_planning_ss)
+                reused_sheets = find_reusable_sheets(report_manifest, assignee_digests)
+
+    with profile_stage('write sheet All Assignees'):
+        write_ipm_planning_assignee_totals_to_spreadsheet(ipm_planning_ss)
+    if report_options.velocity:
+        # velocity covers every story the sprint history was built from, all of a team's stories when planning
+        # teams, and every sprint in the sprint dates workbook up to the sprint being planned
+        with profile_stage('velocity calculation'):
+            velocity_table = calc_velocity_table(ipm_planning_ss.story_store, sprint_data.sprint_history,
+                                                 sprint_data.sprint_names, sprint_data.number,
+                                                 sprint_data.sprint_history.story_rows)
+        with profile_stage('write sheet Velocity'):
+            write_velocity_to_spreadsheet(ipm_planning_ss, velocity_table)
+    try:
+        if use_render:
+            render_ipm_planning_data(ipm_planning_ss, render_jobs, reused_sheets)
+        else:
+            write_ipm_planning_data_to_spreadsheet(ipm_planning_ss)
+            with profile_stage('workbook close'):
+                ipm_planning_ss.workbook.close()
+    except BaseException:
+        # leave the previous output file as it was and don't leave a half written temporary file behind
+        if os.path.exists(ipm_planning_ss.workbook.filename):
+            os.remove(ipm_planning_ss.workbook.filename)
+        raise
+    finish_report_workbook(ipm_planning_ss)
+
+    if report_options.incremental:
+        with profile_stage('write report manifest'):
+            write_report_manifest(ipm_planning_ss, assignee_digests)
+
+    return ipm_planning_ss.output_path
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def write_csv_report(ipm_planning_ss: IpmPlanningSS, sprint_to_plan: str) -> str:
+    # a folder with a csv file per assignee, named after the assignee, and an All Assignees.csv of the point totals
+    # the folder is written next to the output folder and swapped in once it is complete
+    output_dir = get_report_output_path(sprint_to_plan, '')
+    new_output_dir = output_dir + '.tmp'
+    shutil.rmtree(new_output_dir, ignore_errors=True)
+    os.makedirs(new_output_dir)
+    story_store = ipm_planning_ss.story_store
+    with open(os.path.join(new_output_dir, 'All Assignees.csv'), 'w', newline='') as totals_file:
+        totals_writer = csv.writer(totals_file)
+        totals_writer.writerow(('assignee', 'initial_points_total', 'final_points_total'))
+        for cur_assignees_rec in ipm_planning_ss.assignees:
+            totals_writer.writerow((cur_assignees_rec.assignee, cur_assignees_rec.initial_points_total,
+                                    cur_assignees_rec.final_points_total))
+            with open(os.path.join(new_output_dir, str(cur_assignees_rec.assignee) + '.csv'), 'w',
+                      newline='') as assignee_file:
+                assignee_writer = csv.writer(assignee_file)
+                assignee_writer.writerow(REPORT_FIELDS)
+                assignee_writer.writerows(iter_assignee_report_rows(story_store, cur_assignees_rec))
+
+    # the previous folder is moved aside rather than deleted first, so the output folder is only missing for a moment
+    old_output_dir = output_dir + '.old'
+    shutil.rmtree(old_output_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.replace(output_dir, old_output_dir)
+    os.replace(new_output_dir, output_dir)
+    shutil.rmtree(old_output_dir, ignore_errors=True)
+
+    return output_dir
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def write_json_report(ipm_planning_ss: IpmPlanningSS, sprint_to_plan: str) -> str:
+    # one JSON document with every assignee's stories and point totals, written an assignee at a time so only one
+    # assignee's stories are held as JSON at once, a new story's remaining story points are null
+    output_path = get_report_output_path(sprint_to_plan, '.json')
+    story_store = ipm_planning_ss.story_store
+    with open(output_path + '.tmp', 'w') as json_file:
+        json_file.write('{"sprint": ' + json.dumps(sprint_to_plan) +
+                        ', "created": ' + json.dumps(datetime.now().isoformat(timespec='seconds')) +
+                        ', "assignees": [')
+        for assignee_num, cur_assignees_rec in enumerate(ipm_planning_ss.assignees):
+            stories = []
+            for report_row in iter_assignee_report_rows(story_store, cur_assignees_rec):
+                story_rec = dict(zip(REPORT_FIELDS, report_row))
+                if story_rec['remaining_story_points'] == '':
+                    story_rec['remaining_story_points'] = None
+                stories.append(story_rec)
+            if assignee_num:
+                json_file.write(', ')
+            json.dump({'assignee': cur_assignees_rec.assignee,
+                       'initial_points_total': cur_assignees_rec.initial_points_total,
+                       'final_points_total': cur_assignees_rec.final_points_total,
+                       'stories': stories}, json_file)
+        json_file.write('], "initial_points_total": ' +
+                        json.dumps(sum(cur_assignees_rec.initial_points_total
+                                       for cur_assignees_rec in ipm_planning_ss.assignees)) +
+                        ', "final_points_total": ' +
+                        json.dumps(sum(cur_assignees_rec.final_points_total
+                                       for cur_assignees_rec in ipm_planning_ss.assignees)) + '}')
+    os.replace(output_path + '.tmp', output_path)
+
+    return output_path
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def write_parquet_report(ipm_planning_ss: IpmPlanningSS, sprint_to_plan: str) -> str:
+    # pyarrow is only needed for the parquet output, so it is only imported when one is asked for
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # one row per story with the REPORT_FIELDS columns followed by the point totals of the story's assignee,
+    # buffered into row groups of PARQUET_ROW_GROUP_SIZE stories, a new story's remaining story points are null
+    output_path = get_report_output_path(sprint_to_plan, '.parquet')
+    story_store = ipm_planning_ss.story_store
+    parquet_schema = pa.schema([('key', pa.string()), ('issue_type', pa.string()), ('summary', pa.string()),
+                                ('assignee', pa.string()), ('status', pa.string()), ('priority', pa.string()),
+                                ('initial_story_points', pa.float64()), ('carryover_story', pa.string()),
+                                ('remaining_story_points', pa.float64()), ('final_story_points', pa.float64()),
+                                ('sprints_carried', pa.int32()), ('created_sprint', pa.int32()),
+                                ('resolved_sprint', pa.int32()), ('assignee_initial_points_total', pa.float64()),
+                                ('assignee_final_points_total', pa.float64())])
+    remaining_field_num = REPORT_FIELDS.index('remaining_story_points')
+    initial_total_field_num = parquet_schema.get_field_index('assignee_initial_points_total')
+    final_total_field_num = parquet_schema.get_field_index('assignee_final_points_total')
+    with pq.ParquetWriter(output_path + '.tmp', parquet_schema) as parquet_writer:
+        row_group = [[] for _ in parquet_schema]
+        for cur_assignees_rec in ipm_planning_ss.assignees:
+            for report_row in iter_assignee_report_rows(story_store, cur_assignees_rec):
+                for field_num, field_value in enumerate(report_row):
+                    row_group[field_num].append(field_value)
+                if report_row[remaining_field_num] == '':
+                    row_group[remaining_field_num][-1] = None
+                row_group[initial_total_field_num].append(cur_assignees_rec.initial_points_total)
+                row_group[final_total_field_num].append(cur_assignees_rec.final_points_total)
+                if len(row_group[0]) >= PARQUET_ROW_GROUP_SIZE:
+                    parquet_writer.write_table(pa.table(row_group, schema=parquet_schema))
+                    row_group = [[] for _ in parquet_schema]
+        if row_group[0] or not ipm_planning_ss.assignees:
+            parquet_writer.write_table(pa.table(row_group, schema=parquet_schema))
+    os.replace(output_path + '.tmp', output_path)
+
+    return output_path
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def get_sprint_num_to_plan(sprint_date_index: SprintDateIndex | None = None) -> int:
+    # without the sprint dates any number is taken, choose_sprint_num_to_plan() checks it once they are loaded
     sprint_number: int = 0
     valid_option: bool = False
 
@@ -332,38 +1764,129 @@ def get_sprint_num_to_plan() -> int:
         print('***    Enter the Sprint Number to Plan    ***')
         print('***                                       ***')
         print('*********************************************')
-        user_input = input('\nEnter Sprint Number to plan (should be two digits only) ==> ')
+        user_input = input('\nEnter Sprint Number to plan ==> ')
         if user_input.isdecimal():  # Verify that the user input was a number
             sprint_number = int(user_input)
-            # if sprint_number > 39 and sprint_number < 100:
-            if 39 < sprint_number < 100:
+            if sprint_date_index is None or is_plannable_sprint(sprint_date_index, sprint_number):
                 valid_option = True
             else:
-                print('\n\n\nInvalid Sprint Number, valid Sprint Numbers are between 40 & 99 inclusive')
+                print('\n\n\nInvalid Sprint Number, ' + describe_plannable_sprints(sprint_date_index))
         else:
-            print('\n\n\nInvalid option Selected, enter two digit sprint number only')
+            print('\n\n\nInvalid option Selected, enter the sprint number only')
 
     return sprint_number
 
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def get_sprint_name_and_dates(sprint_data: SprintData) -> None:
+def calc_input_cache_keys(input_path: Path, parser) -> tuple[str, str]:
+    # the source key identifies the input file and the parser reading it, the content key identifies this exact
+    # version of the file, so a changed file gets a new cache entry and the stale entries for the source are dropped
+    file_stat = input_path.stat()
+    source_text = str(input_path.resolve()) + '|' + parser.__module__ + '.' + parser.__qualname__ + \
+        '|' + str(INPUT_CACHE_VERSION)
+    source_key = hashlib.sha256(source_text.encode('utf-8')).hexdigest()[:16]
+
+    content_hash = hashlib.sha256()
+    content_hash.update((str(file_stat.st_size) + '|' + str(file_stat.st_mtime_ns) + '|').encode('utf-8'))
+    with open(input_path, 'rb') as input_file:
+        for chunk in iter(lambda: input_file.read(1024 * 1024), b''):
+            content_hash.update(chunk)
+
+    return source_key, content_hash.hexdigest()[:32]
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def evict_input_cache(input_cache: InputCache) -> None:
+    # drop the least recently used cache entries until the cache fits in its size budget
+    cache_files = sorted(input_cache.cache_dir.glob('*.pickle'), key=lambda cache_file: cache_file.stat().st_mtime)
+    cache_bytes = sum(cache_file.stat().st_size for cache_file in cache_files)
+    for cache_file in cache_files:
+        if cache_bytes <= input_cache.max_bytes:
+            break
+        cache_bytes -= cache_file.stat().st_size
+        cache_file.unlink(missing_ok=True)
+
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def clear_input_cache(input_cache: InputCache) -> None:
+    if input_cache.cache_dir.is_dir():
+        for cache_file in input_cache.cache_dir.glob('*.pickle'):
+            cache_file.unlink(missing_ok=True)
+    print('   Cleared parsed input cache ' + str(input_cache.cache_dir))
+
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def load_parsed_input(input_cache: InputCache, input_path: Path, parser):
+    # return parser(input_path), reusing the parsed object from the cache when the input file hasn't changed
+    if not input_cache.enabled or not input_path.is_file():
+        return parser(input_path)
+
+    source_key, content_key = calc_input_cache_keys(input_path, parser)
+    cache_path = input_cache.cache_dir / (source_key + '-' + content_key + '.pickle')
+    if cache_path.is_file():
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                parsed_input = pickle.load(cache_file)
+            os.utime(cache_path)  # mark the entry as recently used for eviction
+            print('   Loaded ' + input_path.name + ' from the parsed input cache')
+            return parsed_input
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            cache_path.unlink(missing_ok=True)
+
+    parsed_input = parser(input_path)
+
+    try:
+        input_cache.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_cache_path = cache_path.with_suffix('.tmp')
+        with open(tmp_cache_path, 'wb') as cache_file:
+            pickle.dump(parsed_input, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_cache_path, cache_path)
+        # remove the entries for older versions of this input file
+        for stale_cache_path in input_cache.cache_dir.glob(source_key + '-*.pickle'):
+            if stale_cache_path != cache_path:
+                stale_cache_path.unlink(missing_ok=True)
+        evict_input_cache(input_cache)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as cache_error:
+        print('   Unable to cache ' + input_path.name + ': ' + str(cache_error))
+
+    return parsed_input
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def parse_sprint_date_index(sprint_dates_path: Path) -> SprintDateIndex:
+    from kclGetJiraSprintDates_2 import SprintDateData
+
+    return build_sprint_date_index(SprintDateData(sprint_dates_path))
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def load_sprint_date_index(input_cache: InputCache) -> SprintDateIndex:
     # build the path to the Input folder where the Sprint Dates Spreadsheet and Sprint Data spreadsheets reside
     # FAST Sprint Start-End Dates.xlsx contains the name, start, and end dates for all FAST sprints in Jira
-    jira_sprint_date_data = SprintDateData(Path.cwd() / 'Input files' / 'FAST Sprint Start-End Dates.xlsx')
+    with profile_stage('SprintDateData load'):
+        return load_parsed_input(input_cache, SPRINT_DATES_PATH, parse_sprint_date_index)
 
-    if jira_sprint_date_data:
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def load_jira_story_data(input_cache: InputCache) -> StoryStore:
+    # Jira Sprint Planning Data.xlsx contains the Jira Story data for the stories to process and report on
+    with profile_stage('JiraSprintData load'):
+        return load_parsed_input(input_cache, JIRA_STORY_DATA_PATH, parse_jira_story_store)
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def get_sprint_name_and_dates(sprint_data: SprintData, sprint_date_index: SprintDateIndex) -> None:
+
+    if sprint_date_index:
         # Get the sprint date info for the sprint_number entered by the user
-        jira_date_ss_rec = jira_sprint_date_data.get_sprint_data(sprint_data.number)
-        sprint_data.cur_sprint = SprintInfo(jira_date_ss_rec.name,
-                                            jira_date_ss_rec.start_date,
-                                            jira_date_ss_rec.end_date)
+        sprint_data.cur_sprint = find_sprint_by_number(sprint_date_index, sprint_data.number)
 
         # Get the sprint date info for the previous sprint to the sprint_number entered by the user
-        jira_date_ss_rec = jira_sprint_date_data.get_sprint_data(sprint_data.number - 1)
-        sprint_data.prev_sprint = SprintInfo(jira_date_ss_rec.name,
-                                             jira_date_ss_rec.start_date,
-                                             jira_date_ss_rec.end_date)
+        sprint_data.prev_sprint = find_sprint_by_number(sprint_date_index, sprint_data.number - 1)
     else:
         print('****** Error getting Sprint Name and Date Data ****** ')
 
@@ -371,21 +1894,29 @@ def get_sprint_name_and_dates(sprint_data: SprintData) -> None:
 
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def get_jira_sprint_data_to_plan() -> SprintData:
+def build_sprint_data(sprint_number: int, sprint_date_index: SprintDateIndex, story_data: StoryStore,
+                      sprint_history: SprintHistoryIndex | None = None) -> SprintData | None:
     sprint_data = SprintData()
-
-    # get the sprint number to process from the user via console input
-    sprint_data.number = get_sprint_num_to_plan()
-    # sprint_data.number = 41  # used for debugging chain number to sprint you want to use and comment out line above
-
-    # Get the sprint date info for the sprint_number entered by the user
-    get_sprint_name_and_dates(sprint_data)
-
-    # get the jira sprint story data to process
-    # build the path to the Input folder where the Sprint Dates Spreadsheet and Sprint Data spreadsheets reside
-    # Jira.xlsx contains the Jira Story data for the stories in the sprint to process and report on
-    jira_sprint_planning_data_path = Path.cwd() / 'Input files' / 'Jira Sprint Planning Data.xlsx'
-    sprint_data.story_data = JiraSprintData(jira_sprint_planning_data_path)
+    sprint_data.number = sprint_number
+
+    # Get the sprint date info for the sprint_number to plan and the sprint before it
+    get_sprint_name_and_dates(sprint_data, sprint_date_index)
+    if sprint_data.cur_sprint:
+        sprint_data.report_name = sprint_data.cur_sprint.name
+    sprint_data.story_data = story_data
+    sprint_data.sprint_dates = sprint_date_index
+    sprint_data.sprint_names = get_sprint_names(sprint_date_index)
+
+    # build the sprint history of every story once, unless it was already built for a batch of sprints, the story
+    # date sprints are worked out along with it since they change when the same input files change. Sprint names
+    # that don't end in their number get no prefix and are matched by their full names
+    if sprint_history is None and story_data is not None:
+        with profile_stage('sprint history index'):
+            sprint_prefix = get_sprint_prefix(sprint_date_index, [sprint_number])
+            sprint_history = build_sprint_history_index(story_data, sprint_prefix,
+                                                        sprint_names=sprint_data.sprint_names)
+            map_story_dates_to_sprints(story_data, sprint_date_index)
+    sprint_data.sprint_history = sprint_history
 
     if sprint_data.cur_sprint is None or sprint_data.prev_sprint is None or sprint_data.story_data is None:
         sprint_data = None
@@ -394,32 +1925,704 @@ def get_jira_sprint_data_to_plan() -> SprintData:
     return sprint_data
 
 
-# **********************************************************************************************************************
-# **********************************************************************************************************************
-# * Main
-# **********************************************************************************************************************
-# **********************************************************************************************************************
-def main():
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def choose_sprint_num_to_plan(input_cache: InputCache, sprint_number: int,
+                              prompted: bool) -> tuple[int | None, SprintDateIndex]:
+
+    # the sprint number is asked for before the sprint dates are loaded, so the prompt shows without waiting for the
+    # spreadsheet libraries, and checked against the sprint dates here. A typed in number that isn't in them is asked
+    # for again, a sprint number from the command line that isn't in them is None
+    sprint_date_index = load_sprint_date_index(input_cache)
+    if not is_plannable_sprint(sprint_date_index, sprint_number):
+        if prompted:
+            print('\n\n\nInvalid Sprint Number, ' + describe_plannable_sprints(sprint_date_index))
+            sprint_number = get_sprint_num_to_plan(sprint_date_index)
+        else:
+            print('****** Invalid Sprint Number ' + str(sprint_number) + ', ' +
+                  describe_plannable_sprints(sprint_date_index))
+            sprint_number = None
 
-    sprint_data = get_jira_sprint_data_to_plan()
-    sprint_to_plan = sprint_data.cur_sprint.name
+    return sprint_number, sprint_date_index
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def get_jira_sprint_data_to_plan(input_cache: InputCache, sprint_date_index: SprintDateIndex,
+                                 sprint_number: int) -> SprintData:
+
+    # get the jira sprint story data to process, the sprint dates are already loaded to check the sprint number
+    return build_sprint_data(sprint_number, sprint_date_index, load_jira_story_data(input_cache))
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def create_ipm_planning_report(sprint_data: SprintData, report_options: ReportOptions | None = None) -> list[str]:
+    if report_options is None:
+        report_options = ReportOptions()
+    sprint_to_plan = sprint_data.report_name
+    run_profile.label = sprint_to_plan
 
     print('\n\nStarting to Create IPM Planning Spreadsheet ' + sprint_to_plan)
 
-    stories_by_assignee = []
-    for cur_story_rec in sprint_data.story_data:
-        # check if this is a carry over story and set carry_over_story field to 'Y' or 'N'
-        if sprint_data.prev_sprint.name in cur_story_rec.sprints:
-            cur_story_rec.carry_over_story = 'Y'
+    story_store = sprint_data.story_data
+    story_rows = sprint_data.story_rows
+    if story_rows is None:
+        story_rows = range(len(story_store))
+
+    with profile_stage('carry-over classification'):
+        for story_row in story_rows:
+            # check if this is a carry over story and set its carry_over flag
+            story_history_status = review_story_sprint_history(sprint_data.sprint_history, story_row,
+                                                               sprint_data.number)
+            story_store.carry_over[story_row] = story_history_status == 'Carryover Story'
+            story_store.sprints_carried[story_row] = count_sprints_carried(sprint_data.sprint_history, story_row,
+                                                                           sprint_data.number)
+
+    with profile_stage('grouping'):
+        stories_by_assignee = group_stories_by_field(story_store, 'assignee', story_rows)
+
+    # the report data every output format is written from, the xlsx output adds its workbook to it
+    ipm_planning_ss = IpmPlanningSS()
+    ipm_planning_ss.story_store = story_store
+    ipm_planning_ss.assignees = stories_by_assignee
+    with profile_stage('point totals'):
+        calc_assignee_point_totals(ipm_planning_ss)
+    sprint_data.assignees = stories_by_assignee
+
+    # the xlsx output is profiled stage by stage inside write_xlsx_report(), the others are a stage each
+    report_writers = {'csv': write_csv_report, 'json': write_json_report, 'parquet': write_parquet_report}
+    output_paths = []
+    for output_format in report_options.output_formats:
+        if output_format == 'xlsx':
+            output_paths.append(write_xlsx_report(ipm_planning_ss, sprint_data, report_options))
+        else:
+            with profile_stage('write ' + output_format + ' output'):
+                output_paths.append(report_writers[output_format](ipm_planning_ss, sprint_to_plan))
+
+    if report_options.verify:
+        with profile_stage('verify'):
+            totals_match = verify_assignee_point_totals(ipm_planning_ss, story_rows,
+                                                        'xlsx' in report_options.output_formats)
+        if not totals_match:
+            raise ValueError('the totals in ' + ', '.join(output_paths) + ' do not match the story data')
+
+    return output_paths
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def parse_output_formats(formats_arg: str) -> list[str]:
+    # turn an output format list like 'xlsx,json' into ['xlsx', 'json']
+    output_formats = []
+    for output_format in formats_arg.split(','):
+        output_format = output_format.strip().lower()
+        if output_format not in REPORT_OUTPUT_FORMATS:
+            raise argparse.ArgumentTypeError('unknown output format ' + repr(output_format) + ', expected a list of ' +
+                                             ', '.join(REPORT_OUTPUT_FORMATS))
+        if output_format not in output_formats:
+            output_formats.append(output_format)
+
+    return output_formats
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def parse_sprint_list(sprints_arg: str) -> list[int | tuple[date, date]]:
+    # turn a sprint list like '40-45,48' into [40, 41, 42, 43, 44, 45, 48], a date range like 2024-01-01..2024-03-31
+    # is kept as a (first day, last day) tuple until the sprint dates are loaded, see resolve_sprint_list()
+    sprint_numbers = []
+    for sprint_range in sprints_arg.split(','):
+        if '..' in sprint_range:
+            try:
+                first_day, last_day = (date.fromisoformat(range_day.strip()) for range_day in sprint_range.split('..'))
+            except ValueError:
+                raise argparse.ArgumentTypeError('invalid date range ' + repr(sprint_range) +
+                                                 ', expected e.g. 2024-01-01..2024-03-31') from None
+            sprint_numbers.append((first_day, last_day))
+            continue
+        first_sprint, _, last_sprint = sprint_range.strip().partition('-')
+        if not first_sprint.isdecimal() or (last_sprint and not last_sprint.isdecimal()):
+            raise argparse.ArgumentTypeError('invalid sprint list ' + repr(sprints_arg) + ', expected e.g. 40-45,48 or '
+                                             '2024-01-01..2024-03-31')
+        for sprint_number in range(int(first_sprint), int(last_sprint or first_sprint) + 1):
+            if sprint_number not in sprint_numbers:
+                sprint_numbers.append(sprint_number)
+
+    return sprint_numbers
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def resolve_sprint_list(sprint_date_index: SprintDateIndex, sprint_list: list[int | tuple[date, date]]) -> list[int]:
+    # the sprint numbers of a parsed sprint list, each date range replaced by the sprints that are at least partly in it
+    sprint_numbers = []
+    for sprint_item in sprint_list:
+        if isinstance(sprint_item, tuple):
+            item_numbers = find_sprints_in_range(sprint_date_index, *sprint_item)
         else:
-            cur_story_rec.carry_over_story = 'N'
-        update_planning_spreadsheet_assignees_stories(stories_by_assignee, cur_story_rec, cur_story_rec.assignee)
+            item_numbers = [sprint_item]
+        for sprint_number in item_numbers:
+            if sprint_number not in sprint_numbers:
+                sprint_numbers.append(sprint_number)
+
+    return sprint_numbers
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def init_report_worker(worker_state: dict, report_options: ReportOptions) -> None:
+    # runs once in each worker process, the parsed input in worker_state is pickled to the worker once instead of once
+    # per report
+    batch_worker_state.clear()
+    batch_worker_state.update(worker_state)
+    batch_worker_state['report_options'] = report_options
+
+    configure_logging(report_options.debug)
+    if report_options.profile_path:
+        enable_run_profile()
 
-    ipm_planning_ss = create_sprint_report_spreadsheet(stories_by_assignee, sprint_to_plan)
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def run_report_job(job_runner, report_job) -> tuple[list[str], object, float, list[dict]]:
+    # job_runner(report_job) returns the output paths and anything else the caller wants back, this adds the job's
+    # wall time and hands its stage timings back to the parent process, which writes the run profile
+    start_time = time.perf_counter()
+    first_stage = len(run_profile.stages)
+    output_paths, job_extra = job_runner(report_job)
+    job_stages = run_profile.stages[first_stage:]
+    del run_profile.stages[first_stage:]
 
-    write_ipm_planning_assignee_totals_to_spreadsheet(ipm_planning_ss)
-    write_ipm_planning_data_to_spreadsheet(ipm_planning_ss)
-    ipm_planning_ss.workbook.close()
+    return output_paths, job_extra, time.perf_counter() - start_time, job_stages
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def run_report_jobs(job_runner, report_jobs: dict, worker_state: dict, report_options: ReportOptions, num_jobs: int,
+                    results_title: str, jobs_name: str, start_time: float) -> dict:
+    # run job_runner on every job in report_jobs, which maps each job to its label in the results table, one after
+    # another in this process or in num_jobs worker processes that get worker_state once. A job that fails doesn't
+    # stop the others, its result is the exception, the others' results are those of run_report_job()
+    job_results = {}
+    if num_jobs == 1 or len(report_jobs) == 1:
+        init_report_worker(worker_state, report_options)
+        for report_job in report_jobs:
+            try:
+                job_results[report_job] = run_report_job(job_runner, report_job)
+            except Exception as job_error:
+                job_results[report_job] = job_error
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=min(num_jobs, len(report_jobs)), initializer=init_report_worker,
+                                 initargs=(worker_state, report_options)) as executor:
+            job_futures = {executor.submit(run_report_job, job_runner, report_job): report_job
+                           for report_job in report_jobs}
+            for job_future in as_completed(job_futures):
+                try:
+                    job_results[job_futures[job_future]] = job_future.result()
+                except Exception as job_error:
+                    job_results[job_futures[job_future]] = job_error
+
+    print('\n\n' + results_title)
+    num_failed = 0
+    for report_job, job_label in report_jobs.items():
+        job_result = job_results[report_job]
+        if isinstance(job_result, Exception):
+            num_failed += 1
+            print('   {}  FAILED   {}: {}'.format(job_label, type(job_result).__name__, job_result))
+        else:
+            print('   {}  {:7.2f}s  {}'.format(job_label, job_result[2], ', '.join(job_result[0])))
+            run_profile.stages.extend(job_result[3])
+    print('   {} of {} {} written in {:.2f}s'.format(len(report_jobs) - num_failed, len(report_jobs), jobs_name,
+                                                   time.perf_counter() - start_time))
+
+    return job_results
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def run_batch_sprint(sprint_number: int) -> tuple[list[str], None]:
+    sprint_history = batch_worker_state['sprint_history']
+    sprint_data = build_sprint_data(sprint_number, batch_worker_state['sprint_date_index'],
+                                    batch_worker_state['story_data'], sprint_history)
+    if sprint_data is None:
+        raise ValueError('no sprint dates found for sprint ' + str(sprint_number))
+
+    # one export holds the stories of many sprints, so only report the stories that are in the sprint being planned
+    sprint_data.story_rows = sprint_history.sprint_stories.get(sprint_number, [])
+
+    return create_ipm_planning_report(sprint_data, batch_worker_state['report_options']), None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def run_batch(sprint_list: list[int | tuple[date, date]], input_cache: InputCache, report_options: ReportOptions,
+              num_jobs: int) -> bool:
+    batch_start_time = time.perf_counter()
+
+    # parse the input spreadsheets once, every sprint in the batch is planned from the same data
+    sprint_date_index = load_sprint_date_index(input_cache)
+    sprint_numbers = resolve_sprint_list(sprint_date_index, sprint_list)
+    if not sprint_numbers:
+        print('****** No sprints in the Sprint Dates spreadsheet fall in the dates to plan ******')
+        return False
+    story_data = load_jira_story_data(input_cache)
+    with profile_stage('sprint history index'):
+        sprint_history = build_sprint_history_index(story_data, get_sprint_prefix(sprint_date_index, sprint_numbers),
+                                                    sprint_names=get_sprint_names(sprint_date_index))
+        map_story_dates_to_sprints(story_data, sprint_date_index)
+
+    sprint_results = run_report_jobs(run_batch_sprint,
+                                     {sprint_number: 'Sprint {:>3}'.format(sprint_number)
+                                      for sprint_number in sprint_numbers},
+                                     {'sprint_date_index': sprint_date_index, 'story_data': story_data,
+                                      'sprint_history': sprint_history},
+                                     report_options, num_jobs, 'Batch results', 'sprints', batch_start_time)
+
+    return not any(isinstance(sprint_result, Exception) for sprint_result in sprint_results.values())
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def load_team_sprint_date_index(input_cache: InputCache, team_rec: TeamRec,
+                                sprint_date_index: SprintDateIndex) -> SprintDateIndex:
+    # the team's own sprint dates workbook if it has one, otherwise the shared sprint dates, either way under the
+    # sprint prefix of the team's stories so the sprint names match the stories' sprint lists
+    team_dates_path = INPUT_FILES_DIR / (team_rec.name + TEAM_SPRINT_DATES_SUFFIX)
+    if team_dates_path.is_file():
+        with profile_stage('SprintDateData load ' + team_rec.name):
+            sprint_date_index = load_parsed_input(input_cache, team_dates_path, parse_sprint_date_index)
+    if team_rec.sprint_prefix is None or \
+            team_rec.sprint_prefix == get_sprint_prefix(sprint_date_index, sprint_date_index.sorted_numbers):
+        return sprint_date_index
+
+    return rename_sprint_date_index(sprint_date_index, team_rec.sprint_prefix)
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def run_team_sprint(team_name: str) -> tuple[list[str], dict]:
+    # plan the sprint for one team from the shared story data, which the teams only hold row numbers into. The teams'
+    # story rows don't overlap, so teams planned one after another in the same process don't disturb each other's
+    # carry over flags
+    sprint_number = batch_worker_state['sprint_number']
+    team_rec = batch_worker_state['teams'][team_name]
+    story_data = batch_worker_state['story_data']
+    if team_rec.sprint_prefix is None:
+        raise ValueError('none of the stories of team ' + team_name + ' have been in a sprint')
+    with profile_stage('sprint history index'):
+        sprint_history = build_sprint_history_index(story_data, team_rec.sprint_prefix, team_rec.story_rows)
+        map_story_dates_to_sprints(story_data, team_rec.sprint_date_index, team_rec.story_rows)
+    sprint_data = build_sprint_data(sprint_number, team_rec.sprint_date_index, story_data, sprint_history)
+    if sprint_data is None:
+        raise ValueError('no sprint dates found for sprint ' + str(sprint_number) + ' of team ' + team_name)
+
+    # projects can share a sprint prefix, so a project's output files are named after the project as well
+    sprint_data.story_rows = team_rec.story_rows
+    if batch_worker_state['team_field'] == 'project':
+        sprint_data.report_name = team_name + ' ' + sprint_data.report_name
+    output_paths = create_ipm_planning_report(sprint_data, batch_worker_state['report_options'])
+    team_totals = {'sprint': sprint_data.cur_sprint.name,
+                   'stories': len(team_rec.story_rows),
+                   'assignees': len(sprint_data.assignees),
+                   'carryover_stories': sum(story_data.carry_over[story_row] for story_row in team_rec.story_rows),
+                   'initial_points_total': sum(cur_assignees_rec.initial_points_total
+                                               for cur_assignees_rec in sprint_data.assignees),
+                   'final_points_total': sum(cur_assignees_rec.final_points_total
+                                             for cur_assignees_rec in sprint_data.assignees)}
+
+    return output_paths, team_totals
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def write_team_rollup_workbook(sprint_number: int, team_results: dict[str, tuple]) -> str:
+    # one Teams worksheet with a row of story counts and point totals for each team that was planned, and their sums.
+    # An assignee can work for more than one team, so the assignee counts aren't summed
+    ipm_planning_ss = create_ss_workbook_and_formats('Teams Sprint ' + str(sprint_number))
+    teams_ws = ipm_planning_ss.workbook.add_worksheet('Teams')
+    teams_ws.set_column('A:B', 20)
+    teams_ws.set_column('C:G', 14)
+    teams_ws.set_column('H:H', 60)
+    teams_ws.write_row(0, 0, ('Team', 'Sprint', 'Stories', 'Assignees', 'Carryover Stories', 'Initial Story Points',
+                              'Final Story Points', 'Workbook'), ipm_planning_ss.header_fmt)
+
+    ws_row = 0
+    for team_name, team_result in team_results.items():
+        ws_row += 1
+        team_totals = team_result[1]
+        cell_fmt = ipm_planning_ss.last_row_fmt if ws_row == len(team_results) else ipm_planning_ss.center_fmt
+        teams_ws.write(ws_row, 0, team_name, ipm_planning_ss.left_fmt)
+        teams_ws.write_row(ws_row, 1, (team_totals['sprint'], team_totals['stories'], team_totals['assignees'],
+                                       team_totals['carryover_stories'], team_totals['initial_points_total'],
+                                       team_totals['final_points_total']), cell_fmt)
+        teams_ws.write(ws_row, 7, ', '.join(team_result[0]), ipm_planning_ss.left_fmt)
+
+    for total_field, total_col, col_letter in (('stories', 2, 'C'), ('carryover_stories', 4, 'E'),
+                                               ('initial_points_total', 5, 'F'), ('final_points_total', 6, 'G')):
+        teams_ws.write_formula(ws_row + 1, total_col, '=sum(' + col_letter + '2:' + col_letter + str(ws_row + 1) + ')',
+                               ipm_planning_ss.totals_fmt,
+                               sum(team_result[1][total_field] for team_result in team_results.values()))
+    try:
+        ipm_planning_ss.workbook.close()
+    except BaseException:
+        if os.path.exists(ipm_planning_ss.workbook.filename):
+            os.remove(ipm_planning_ss.workbook.filename)
+        raise
+    finish_report_workbook(ipm_planning_ss)
+
+    return ipm_planning_ss.output_path
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def run_teams(sprint_number: int, sprint_date_index: SprintDateIndex, input_cache: InputCache,
+              report_options: ReportOptions, team_field: str, num_jobs: int, write_rollup: bool) -> bool:
+    teams_start_time = time.perf_counter()
+
+    # parse the Jira export once and split it into teams in one pass, each team's report is planned from the same
+    # story data with the team's own sprint dates
+    story_data = load_jira_story_data(input_cache)
+    with profile_stage('team partition'):
+        teams = partition_stories_by_team(story_data, team_field)
+    if not teams:
+        print('****** None of the stories in the Jira export belong to a team ******')
+        return False
+    num_team_stories = sum(len(team_rec.story_rows) for team_rec in teams.values())
+    print('\n   ' + str(len(teams)) + ' teams: ' + ', '.join(teams))
+    if num_team_stories < len(story_data):
+        print('   ' + str(len(story_data) - num_team_stories) + ' stories that were never in a sprint are not in '
+              'any team')
+    for team_rec in teams.values():
+        team_rec.sprint_date_index = load_team_sprint_date_index(input_cache, team_rec, sprint_date_index)
+
+    team_results = run_report_jobs(run_team_sprint, {team_name: '{:<16}'.format(team_name) for team_name in teams},
+                                   {'story_data': story_data, 'teams': teams, 'team_field': team_field,
+                                    'sprint_number': sprint_number},
+                                   report_options, num_jobs, 'Team results', 'teams', teams_start_time)
+    num_failed = sum(isinstance(team_result, Exception) for team_result in team_results.values())
+
+    if write_rollup and num_failed < len(teams):
+        with profile_stage('write team roll-up'):
+            rollup_path = write_team_rollup_workbook(sprint_number, {
+                team_name: team_result for team_name, team_result in team_results.items()
+                if not isinstance(team_result, Exception)})
+        print('   Team roll-up written to ' + rollup_path)
+
+    return num_failed == 0
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def get_input_file_stats(input_paths: list[Path]) -> list[tuple | None]:
+    # size and modification time of each input file, None for a file that isn't there
+    input_stats = []
+    for input_path in input_paths:
+        try:
+            input_stat = input_path.stat()
+            input_stats.append((input_stat.st_size, input_stat.st_mtime_ns))
+        except OSError:
+            input_stats.append(None)
+
+    return input_stats
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def is_complete_xlsx(input_path: Path) -> bool:
+    # an .xlsx is a zip file with its directory at the very end, so a file that is still being downloaded or saved
+    # can't be opened as one
+    try:
+        with zipfile.ZipFile(input_path):
+            return True
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def wait_for_input_change(input_paths: list[Path], last_input_stats: list[tuple | None], poll_secs: float,
+                          settle_secs: float) -> list[tuple | None]:
+    # poll the input files until they differ from last_input_stats, then wait for the partial writes to stop: the
+    # sizes and modification times have to stay the same for settle_secs and every file has to be a complete .xlsx
+    pending_stats = None
+    pending_since = 0.0
+    while True:
+        time.sleep(poll_secs)
+        input_stats = get_input_file_stats(input_paths)
+        if input_stats == last_input_stats:
+            pending_stats = None
+            continue
+        if input_stats != pending_stats:
+            pending_stats = input_stats
+            pending_since = time.monotonic()
+        elif time.monotonic() - pending_since >= settle_secs and \
+                all(input_stat is not None and is_complete_xlsx(input_path)
+                    for input_path, input_stat in zip(input_paths, input_stats)):
+            return input_stats
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def watch_input_files(sprint_number: int, sprint_date_index: SprintDateIndex, sprint_dates_stat: tuple | None,
+                      input_cache: InputCache, report_options: ReportOptions, poll_secs: float,
+                      settle_secs: float) -> None:
+    # regenerate the report for sprint_number every time a new export lands in the Input files folder, until Ctrl-C
+    # the parsed input stays in memory and each file is only parsed again when it changes, the sprint history index
+    # is kept until the story data changes. sprint_date_index was loaded when the sprint dates file had
+    # sprint_dates_stat, so it is only loaded again once the file changes
+    input_paths = [SPRINT_DATES_PATH, JIRA_STORY_DATA_PATH]
+    story_data = None
+    sprint_history = None
+    loaded_stats = [sprint_dates_stat, None]
+    input_stats = get_input_file_stats(input_paths)
+    try:
+        while True:
+            change_time = time.perf_counter()
+            try:
+                if input_stats[0] != loaded_stats[0]:
+                    sprint_date_index = load_sprint_date_index(input_cache)
+                    loaded_stats[0] = input_stats[0]
+                    sprint_history = None
+                if input_stats[1] != loaded_stats[1]:
+                    story_data = load_jira_story_data(input_cache)
+                    loaded_stats[1] = input_stats[1]
+                    sprint_history = None
+                sprint_data = build_sprint_data(sprint_number, sprint_date_index, story_data, sprint_history)
+                if sprint_data:
+                    sprint_history = sprint_data.sprint_history
+                    output_paths = create_ipm_planning_report(sprint_data, report_options)
+                    print('   Wrote {} in {:.2f}s'.format(', '.join(output_paths), time.perf_counter() - change_time))
+            except Exception as report_error:
+                # keep watching, the next export may well be fine
+                print('****** Could not create the report: {}: {}'.format(type(report_error).__name__, report_error))
+
+            print('\nWatching ' + str(INPUT_FILES_DIR) + ' for new exports, press Ctrl-C to stop')
+            input_stats = wait_for_input_change(input_paths, input_stats, poll_secs, settle_secs)
+    except KeyboardInterrupt:
+        print('\nStopped watching ' + str(INPUT_FILES_DIR))
+
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def validate_inputs() -> bool:
+    # the checks --validate makes before exiting, they only need the standard library so scripts can call them cheaply
+    inputs_valid = True
+    for input_path in (SPRINT_DATES_PATH, JIRA_STORY_DATA_PATH):
+        if not input_path.is_file():
+            print('****** Missing input file ' + str(input_path))
+            inputs_valid = False
+        elif not is_complete_xlsx(input_path):
+            print('****** ' + str(input_path) + ' is not a complete .xlsx file')
+            inputs_valid = False
+        else:
+            print('   Found ' + str(input_path))
+    if not Path('Output files').is_dir():
+        print("****** Missing the 'Output files' folder in " + str(Path.cwd()))
+        inputs_valid = False
+
+    return inputs_valid
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def calc_run_stamp(report_options: ReportOptions) -> dict:
+    # everything a single sprint report depends on besides the sprint number: the input files, this script and the
+    # options that change what is written, passed through JSON so it compares equal to a stamp read back from disk
+    run_stamp = {'inputs': get_input_file_stats([SPRINT_DATES_PATH, JIRA_STORY_DATA_PATH, Path(__file__)]),
+                 'options': [report_options.output_formats, report_options.streaming, report_options.velocity,
+                             report_options.verify, report_options.incremental]}
+
+    return json.loads(json.dumps(run_stamp))
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def load_run_stamps(input_cache: InputCache) -> dict:
+    try:
+        with open(input_cache.cache_dir / RUN_STAMPS_FILE_NAME) as run_stamps_file:
+            return json.load(run_stamps_file)
+    except (OSError, ValueError):
+        return {}
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def is_report_up_to_date(input_cache: InputCache, sprint_number: int, run_stamp: dict) -> bool:
+    # true when the last report for this sprint was built from the same run stamp and its output files are still
+    # exactly as that run left them
+    last_run = load_run_stamps(input_cache).get(str(sprint_number))
+    if not last_run or last_run['stamp'] != run_stamp:
+        return False
+    output_paths = list(last_run['outputs'])
+    output_stats = json.loads(json.dumps(get_input_file_stats([Path(output_path) for output_path in output_paths])))
+
+    return output_stats == [last_run['outputs'][output_path] for output_path in output_paths]
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def save_run_stamp(input_cache: InputCache, sprint_number: int, run_stamp: dict, output_paths: list[str]) -> None:
+    run_stamps = load_run_stamps(input_cache)
+    output_stats = get_input_file_stats([Path(output_path) for output_path in output_paths])
+    run_stamps[str(sprint_number)] = {'stamp': run_stamp, 'outputs': dict(zip(output_paths, output_stats))}
+    try:
+        input_cache.cache_dir.mkdir(parents=True, exist_ok=True)
+        run_stamps_path = input_cache.cache_dir / RUN_STAMPS_FILE_NAME
+        with open(run_stamps_path.with_suffix('.tmp'), 'w') as run_stamps_file:
+            json.dump(run_stamps, run_stamps_file, indent=2)
+        os.replace(run_stamps_path.with_suffix('.tmp'), run_stamps_path)
+    except OSError as stamp_error:
+        print('   Unable to save the run stamp: ' + str(stamp_error))
+
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def configure_logging(debug: bool) -> None:
+    logging.basicConfig(format='%(message)s', level=logging.DEBUG if debug else logging.INFO)
+    log.setLevel(logging.DEBUG if debug else logging.INFO)
+
+    return None
+
+
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def build_report_options(args: argparse.Namespace) -> ReportOptions:
+    report_options = ReportOptions()
+    report_options.output_formats = args.formats
+    report_options.streaming = args.output_mode == 'streaming'
+    report_options.velocity = args.velocity
+    report_options.verify = args.verify
+    report_options.profile_path = args.profile
+    report_options.debug = args.debug
+    # watch mode keeps the manifest of the last run so each new export only re-renders the sheets that changed
+    report_options.incremental = args.incremental or args.watch
+    # batch and team modes already keep every core busy with one report per worker, so their sheets are rendered in
+    # the worker
+    report_options.render_jobs = 1 if args.sprints or args.teams else max(1, args.render_jobs)
+
+    return report_options
+
+
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+# * Main
+# **********************************************************************************************************************
+# **********************************************************************************************************************
+def main():
+    parser = argparse.ArgumentParser(description='Create the FAST IPM Planning spreadsheet for a sprint')
+    parser.add_argument('--sprint', type=int,
+                        help='sprint number to plan, skips the sprint number prompt')
+    parser.add_argument('--sprints', type=parse_sprint_list,
+                        help='batch mode, plan every sprint in a list like 40-45,48 using only the stories in '
+                             'each sprint, one workbook per sprint, a date range like 2024-01-01..2024-03-31 in the '
+                             'list stands for every sprint at least partly in it')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and regenerate the report for the sprint every time the input files in '
+                             "'Input files' change, implies --incremental")
+    parser.add_argument('--teams', choices=TEAM_FIELDS,
+                        help='plan the sprint for every team in the Jira export, one workbook per team, splitting the '
+                             'stories by the prefix of their sprint names or by the project of their keys, using '
+                             "--jobs worker processes and the team's own '<team> Sprint Start-End Dates.xlsx' when "
+                             'there is one')
+    parser.add_argument('--rollup', action='store_true',
+                        help="with --teams, also write a 'Teams Sprint N IPM Planning.xlsx' workbook of the story "
+                             'counts and point totals of every team')
+    parser.add_argument('--poll-interval', type=float, default=0.2, metavar='SECS',
+                        help='how often watch mode checks the input files (default: %(default)s)')
+    parser.add_argument('--settle', type=float, default=0.3, metavar='SECS',
+                        help='how long a changed input file has to stay unchanged before watch mode reads it '
+                             '(default: %(default)s)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='number of worker processes used in batch and team modes (default: %(default)s)')
+    parser.add_argument('--render-jobs', type=int, default=1,
+                        help='number of worker processes rendering the assignee worksheets of a single sprint, 1 '
+                             'writes them one after another in this process, not used with streaming output '
+                             '(default: %(default)s)')
+    parser.add_argument('--formats', type=parse_output_formats, default=['xlsx'],
+                        help='comma separated output formats, any of ' + ', '.join(REPORT_OUTPUT_FORMATS) + ': the '
+                             'xlsx workbook, a folder with a csv file per assignee, a single json document or a '
+                             'parquet file (needs pyarrow), only xlsx needs xlsxwriter (default: xlsx)')
+    parser.add_argument('--output-mode', choices=('in-memory', 'streaming'), default='in-memory',
+                        help='in-memory keeps every cell until the workbook is closed, streaming writes each row to '
+                             'disk as it goes so memory stays flat for large reports (default: %(default)s)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse the assignee sheets of the previous workbook whose stories have not changed, '
+                             'keeping a manifest next to the workbook, and print what changed since the last run')
+    parser.add_argument('--velocity', action='store_true',
+                        help='add a Velocity worksheet with committed, carryover and completed (resolved) points and '
+                             'the rolling velocity for every assignee in every sprint up to the one being planned '
+                             '(needs NumPy)')
+    parser.add_argument('--verify', action='store_true',
+                        help='cross check the story point totals written to the workbook against the story data and '
+                             'fail if they do not match')
+    parser.add_argument('--profile', type=Path, metavar='FILE',
+                        help='write the wall time, CPU time and peak traced memory of every stage to FILE, as CSV if '
+                             'it ends in .csv otherwise as JSON (tracing memory slows the run down)')
+    parser.add_argument('--debug', action='store_true',
+                        help='show a line for every story written to the workbook')
+    parser.add_argument('--validate', action='store_true',
+                        help="check that the input files and the 'Output files' folder are there and exit, without "
+                             'loading the spreadsheet libraries')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild the report even if it is up to date with the input files and options')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='parse the input spreadsheets without reading or writing the parsed input cache')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='delete everything in the parsed input cache before running')
+    parser.add_argument('--cache-max-mb', type=int, default=INPUT_CACHE_MAX_MB,
+                        help='size limit of the parsed input cache in MB (default: %(default)s)')
+    args = parser.parse_args()
+    if args.watch and args.sprints:
+        parser.error('--watch plans a single sprint, it cannot be used with --sprints')
+    if args.teams and (args.sprints or args.watch):
+        parser.error('--teams plans a single sprint for each team, it cannot be used with --sprints or --watch')
+    if args.rollup and not args.teams:
+        parser.error('--rollup sums the team workbooks, it needs --teams')
+    if args.validate:
+        sys.exit(0 if validate_inputs() else 1)
+
+    report_options = build_report_options(args)
+    configure_logging(report_options.debug)
+    if report_options.profile_path:
+        enable_run_profile()
+
+    input_cache = InputCache(INPUT_CACHE_DIR, args.cache_max_mb, not args.no_cache)
+    if args.clear_cache:
+        clear_input_cache(input_cache)
+
+    # get the sprint number to process from the user via console input, unless it was given on the command line
+    sprint_number = args.sprint
+    if sprint_number is None and not args.sprints:
+        sprint_number = get_sprint_num_to_plan()
+    # sprint_number = 41  # used for debugging chain number to sprint you want to use and comment out line above
+
+    report_ok = True
+    if args.sprints:
+        report_ok = run_batch(args.sprints, input_cache, report_options, max(1, args.jobs))
+    elif args.teams:
+        sprint_number, sprint_date_index = choose_sprint_num_to_plan(input_cache, sprint_number, args.sprint is None)
+        if sprint_number is None:
+            sys.exit(1)
+        report_ok = run_teams(sprint_number, sprint_date_index, input_cache, report_options, args.teams,
+                              max(1, args.jobs), args.rollup)
+    elif args.watch:
+        # the size and time of the sprint dates file before it is loaded, a change while it loads is picked up later
+        sprint_dates_stat = get_input_file_stats([SPRINT_DATES_PATH])[0]
+        sprint_number, sprint_date_index = choose_sprint_num_to_plan(input_cache, sprint_number, args.sprint is None)
+        if sprint_number is None:
+            sys.exit(1)
+        watch_input_files(sprint_number, sprint_date_index, sprint_dates_stat, input_cache, report_options,
+                          args.poll_interval, args.settle)
+    else:
+        # the run stamp is taken before the input is read, so an export that lands during the run is picked up next
+        # time, a report that is up to date was built for a sprint in the sprint dates so they aren't loaded to check
+        run_stamp = calc_run_stamp(report_options)
+        if input_cache.enabled and not args.force and is_report_up_to_date(input_cache, sprint_number, run_stamp):
+            print('\n   The report for sprint ' + str(sprint_number) + ' is up to date with the input files, use '
+                  '--force to rebuild it')
+        else:
+            sprint_number, sprint_date_index = choose_sprint_num_to_plan(input_cache, sprint_number,
+                                                                         args.sprint is None)
+            if sprint_number is None:
+                sys.exit(1)
+            sprint_data = get_jira_sprint_data_to_plan(input_cache, sprint_date_index, sprint_number)
+            if sprint_data is None:
+                sys.exit(1)
+            try:
+                output_paths = create_ipm_planning_report(sprint_data, report_options)
+                if input_cache.enabled:
+                    save_run_stamp(input_cache, sprint_number, run_stamp, output_paths)
+            except ValueError as verify_error:
+                print('****** ' + str(verify_error))
+                report_ok = False
+
+    if report_options.profile_path:
+        write_run_profile(report_options.profile_path, run_profile.stages)
+    if not report_ok:
+        sys.exit(1)
 
     print('\nCompleted Create IPM Planning Spreadsheet')
 